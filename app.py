@@ -4,6 +4,8 @@ src/モジュールを使用したWebアプリケーション
 """
 import asyncio
 import logging
+import os
+import stat
 import time
 from pathlib import Path
 from typing import Optional
@@ -13,7 +15,6 @@ import aiohttp
 from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.responses import HTMLResponse, FileResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
 
 # src/モジュールをインポート
@@ -23,6 +24,7 @@ sys.path.insert(0, str(Path(__file__).parent))
 from src.camera.camera_manager import CameraManager
 from src.gripper.gripper_manager import GripperManager
 from src.webrtc.webrtc_manager import WebRTCManager
+from src.utils.responses import DefaultJSONResponse
 from src.config.settings import (
     CAMERA_DEVICE,
     SNAPSHOTS_DIR,
@@ -44,11 +46,13 @@ from src.config.settings import (
     ROBOT_SOFT_LIMIT_MIN_MM,
     ROBOT_SOFT_LIMIT_MAX_MM,
     ROBOT_POINT_MOVE_SPEED_RATE,
+    DEV_MODE,
 )
 from src.printer.octoprint_client import OctoPrintClient, OctoPrintError
 from src.printer.printer_manager import PrinterManager
 from src.vision.manager import VisionManager
 from src.robot.teaching_manager import TeachingRobotManager
+from web_app.gripper_api import router as gripper_router, set_manager_provider
 
 import base64
 import cv2
@@ -429,7 +433,11 @@ async def lifespan(app: FastAPI):
 
 
 # FastAPIアプリ
-app = FastAPI(title="自動組み立てロボット制御システム", lifespan=lifespan)
+app = FastAPI(
+    title="自動組み立てロボット制御システム",
+    lifespan=lifespan,
+    default_response_class=DefaultJSONResponse,
+)
 
 
 @app.middleware("http")
@@ -454,7 +462,12 @@ async def on_shutdown() -> None:
 
 # 静的ファイルとテンプレート
 app.mount("/static", StaticFiles(directory="web_app/static"), name="static")
-templates = Jinja2Templates(directory="web_app/templates")
+INDEX_HTML_PATH = Path(__file__).parent / "web_app" / "templates" / "index_webrtc_fixed.html"
+INDEX_HTML = INDEX_HTML_PATH.read_text(encoding="utf-8")
+
+# グリッパーAPI（status/servo/home/move は共通ルーター）
+set_manager_provider(lambda: gripper_manager)
+app.include_router(gripper_router)
 
 
 # Pydanticモデル
@@ -513,8 +526,10 @@ class RobotPositionUpdateRequest(BaseModel):
 # システムのトップページ（http://10.xx.xx.xx:8080/ など）にアクセスした際実行される
 @app.get("/", response_class=HTMLResponse)
 async def index(request: Request):
-    """メインページ"""
-    return templates.TemplateResponse("index_webrtc_fixed.html", {"request": request})
+    """メインページ（起動時に読み込んだHTMLを返す。DEVモード時のみ毎回再読み込み）"""
+    if DEV_MODE:
+        return HTMLResponse(content=INDEX_HTML_PATH.read_text(encoding="utf-8"))
+    return HTMLResponse(content=INDEX_HTML)
 
 
 @app.get("/health")
@@ -694,10 +709,19 @@ async def get_snapshot(filename: str, request: Request):
         if proxied:
             return proxied
     filepath = SNAPSHOTS_DIR / filename
-    if not filepath.exists():
+    try:
+        st = await asyncio.to_thread(os.stat, filepath)
+    except OSError:
+        raise HTTPException(status_code=404, detail="ファイルが見つかりません")
+    if not stat.S_ISREG(st.st_mode):
         raise HTTPException(status_code=404, detail="ファイルが見つかりません")
     
-    return FileResponse(filepath)
+    # stat結果を渡して再statを省く。スナップショットは不変のため長期キャッシュ可
+    return FileResponse(
+        filepath,
+        stat_result=st,
+        headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
 
 
 @app.get("/api/camera/snapshots")
@@ -1161,70 +1185,6 @@ async def robot_position_table_update(point_no: int, request: RobotPositionUpdat
 
 
 # グリッパーAPI
-@app.get("/api/gripper/status")
-async def gripper_status():
-    """グリッパーステータス取得"""
-    if not gripper_manager or not gripper_manager.is_connected:
-        raise HTTPException(status_code=503, detail="グリッパーが接続されていません")
-    
-    try:
-        status = await gripper_manager.get_status()
-        return status
-    except Exception as e:
-        logger.error(f"グリッパーステータス取得エラー: {e}")
-        raise HTTPException(status_code=503, detail=str(e))
-
-
-@app.post("/api/gripper/servo/{action}")
-async def gripper_servo(action: str):
-    """サーボON/OFF"""
-    if not gripper_manager or not gripper_manager.is_connected:
-        raise HTTPException(status_code=503, detail="グリッパーが接続されていません")
-    
-    try:
-        if action == "on":
-            await gripper_manager.servo_on()
-        elif action == "off":
-            await gripper_manager.servo_off()
-        else:
-            raise HTTPException(status_code=400, detail="actionは'on'または'off'を指定してください")
-        
-        return {"status": "ok", "action": action}
-    except Exception as e:
-        logger.error(f"サーボ制御エラー: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-@app.post("/api/gripper/home")
-async def gripper_home():
-    """原点復帰"""
-    if not gripper_manager or not gripper_manager.is_connected:
-        raise HTTPException(status_code=503, detail="グリッパーが接続されていません")
-    
-    try:
-        await gripper_manager.home()
-        return {"status": "ok", "message": "原点復帰を開始しました"}
-    except Exception as e:
-        logger.error(f"原点復帰エラー: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-
-
-@app.post("/api/gripper/move/{position}")
-async def gripper_move(position: int):
-    """ポジション移動"""
-    if not gripper_manager or not gripper_manager.is_connected:
-        raise HTTPException(status_code=503, detail="グリッパーが接続されていません")
-    
-    try:
-        await gripper_manager.move_to_position(position)
-        return {"status": "ok", "position": position}
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        logger.error(f"ポジション移動エラー: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
-
-
 @app.get("/api/gripper/position_table/{position}")
 async def get_position_table(position: int):
     """ポジションテーブル取得"""
@@ -1304,7 +1264,7 @@ async def detect_fiber(request: Request):
     if not camera_manager or not vision_manager:
         raise HTTPException(status_code=503, detail="サービスが利用できません")
     
-    frame = camera_manager.get_frame()
+    frame = camera_manager.get_frame_copy()
     if frame is None:
         raise HTTPException(status_code=500, detail="画像の取得に失敗しました")
     
@@ -1335,7 +1295,7 @@ async def detect_bead(request: Request):
     if not camera_manager or not vision_manager:
         raise HTTPException(status_code=503, detail="サービスが利用できません")
     
-    frame = camera_manager.get_frame()
+    frame = camera_manager.get_frame_copy()
     if frame is None:
         raise HTTPException(status_code=500, detail="画像の取得に失敗しました")
     
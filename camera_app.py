@@ -17,6 +17,7 @@ from src.camera.camera_manager import CameraManager
 from src.webrtc.webrtc_manager import WebRTCManager
 from src.vision.manager import VisionManager
 from src.config.settings import CAMERA_DEVICE, SNAPSHOTS_DIR
+from src.utils.responses import DefaultJSONResponse
 
 logging.basicConfig(
     level=logging.INFO,
@@ -150,7 +151,7 @@ async def lifespan(app: FastAPI):
     await _shutdown_services()
 
 
-app = FastAPI(title="Camera Service", lifespan=lifespan)
+app = FastAPI(title="Camera Service", lifespan=lifespan, default_response_class=DefaultJSONResponse)
 
 
 @app.on_event("startup")
@@ -340,7 +341,7 @@ async def detect_fiber():
     if not camera_manager or not vision_manager:
         raise HTTPException(status_code=503, detail="サービスが利用できません")
 
-    frame = camera_manager.get_frame()
+    frame = camera_manager.get_frame_copy()
     if frame is None:
         raise HTTPException(status_code=500, detail="画像の取得に失敗しました")
 
@@ -363,7 +364,7 @@ async def detect_bead():
     if not camera_manager or not vision_manager:
         raise HTTPException(status_code=503, detail="サービスが利用できません")
 
-    frame = camera_manager.get_frame()
+    frame = camera_manager.get_frame_copy()
     if frame is None:
         raise HTTPException(status_code=500, detail="画像の取得に失敗しました")
 
@@ -19,6 +19,7 @@ from src.config.settings import (
     ROBOT_POINT_MOVE_SPEED_RATE,
 )
 from src.robot.teaching_manager import TeachingRobotManager
+from src.utils.responses import DefaultJSONResponse
 
 logging.basicConfig(
     level=logging.INFO,
@@ -117,7 +118,7 @@ async def lifespan(app: FastAPI):
     await _shutdown_services()
 
 
-app = FastAPI(title="Robot Service", lifespan=lifespan)
+app = FastAPI(title="Robot Service", lifespan=lifespan, default_response_class=DefaultJSONResponse)
 
 
 @app.on_event("startup")
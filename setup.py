@@ -28,6 +28,7 @@ setup(
         "PyYAML>=6.0.0",
         "numpy>=1.24.0",
         "python-multipart>=0.0.6",
+        "orjson>=3.9.0",
     ],
     extras_require={
         "dev": [
@@ -3,9 +3,14 @@
 OpenCVを使ったカメラキャプチャと制御を提供
 """
 import cv2
+import numpy as np
 import asyncio
+import errno
+import os
 import re
+import struct
 import subprocess
+import threading
 import time
 from typing import Optional, Dict, List
 from datetime import datetime
@@ -20,15 +25,117 @@ from src.config.settings import (
 
 logger = logging.getLogger(__name__)
 
+# フレームリングのスロット数（読み出し側が参照中のスロットをすぐに上書きしないよう3面）
+FRAME_RING_SIZE = 3
+
+# コントロール一覧キャッシュの有効期限 [秒]（UIのポーリング毎にv4l2-ctlを起動しない）
+CONTROLS_CACHE_TTL = 2.0
+
+# VIDIOC_S_CTRL = _IOWR('V', 28, struct v4l2_control {__u32 id; __s32 value;})
+VIDIOC_S_CTRL = 0xC008561C
+
+# v4l2-ctl -L の解析用（モジュール読み込み時に1回だけコンパイル）
+_CONTROL_SECTIONS = frozenset((
+    'User Controls', 'Camera Controls', 'Codec Controls',
+    'JPEG Compression Controls', 'Image Processing Controls',
+    'Image Source Controls',
+))
+# 例: "brightness 0x00980900 (int)    : min=-64 max=64 step=1 default=0 value=0"
+_CTRL_LINE_RE = re.compile(r'\s*(\S+)\s+0x([0-9a-f]+)\s+\((\w+)\)\s*:?(.*)$')
+_CTRL_FIELD_RE = re.compile(r'(\w+)=(?:0x)?(-?[0-9a-f]+)')
+_MENU_OPTION_RE = re.compile(r'^\s+(\d+):\s+(.+)$')
+# 型ごとに必須の値（書き込み専用のpan_relative等はvalue=、ドライバによってはstep=が出力されない）
+_CTRL_REQUIRED_FIELDS = {
+    'int': frozenset(('min', 'max', 'step', 'default', 'value')),
+    'int64': frozenset(('min', 'max', 'step', 'default', 'value')),
+    'menu': frozenset(('min', 'max', 'default', 'value')),
+    'bool': frozenset(('default', 'value')),
+    'bitmask': frozenset(('max', 'default', 'value')),
+    'button': frozenset(),
+}
+
+
+def _parse_v4l2_controls(output: str) -> Dict:
+    """
+    v4l2-ctl -L の出力をコントロール名ごとの辞書に変換
+    未対応の型や必須の値が欠けたコントロールはスキップする
+    """
+    controls = {}
+    current_control_name = None
+    current_section = None
+    
+    for line in output.splitlines():
+        # セクションヘッダーを記録
+        stripped = line.strip()
+        if stripped in _CONTROL_SECTIONS:
+            current_section = stripped
+            continue
+        
+        # 空行をスキップ
+        if not stripped:
+            continue
+        
+        # コントロール行: 名前・ID・型を1回のマッチで取得し、型ごとに値を解釈
+        ctrl_match = _CTRL_LINE_RE.match(line)
+        if ctrl_match:
+            name, ctrl_id, ctrl_type, rest = ctrl_match.groups()
+            rest, _, flags = rest.partition('flags=')
+            fields = dict(_CTRL_FIELD_RE.findall(rest))
+            required = _CTRL_REQUIRED_FIELDS.get(ctrl_type)
+            if required is None or not required <= fields.keys():
+                # 続くメニューオプション行を直前のコントロールに付けない
+                current_control_name = None
+                continue
+            ctrl = {'type': ctrl_type, 'id': f'0x{ctrl_id}'}
+            
+            if ctrl_type in ('int', 'int64'):
+                ctrl.update({k: int(fields[k]) for k in ('min', 'max', 'step', 'default', 'value')})
+            elif ctrl_type == 'menu':
+                ctrl.update({k: int(fields[k]) for k in ('min', 'max', 'default', 'value')})
+                ctrl['step'] = 1
+            elif ctrl_type == 'bool':
+                ctrl.update({'min': 0, 'max': 1, 'step': 1,
+                             'default': int(fields['default']), 'value': int(fields['value'])})
+            elif ctrl_type == 'bitmask':
+                ctrl.update({'min': 0, 'max': int(fields['max'], 16),
+                             'default': int(fields['default'], 16), 'value': int(fields['value'], 16)})
+            
+            ctrl['flags'] = flags.strip()
+            if ctrl_type == 'menu':
+                ctrl['options'] = {}
+            ctrl['section'] = current_section
+            controls[name] = ctrl
+            current_control_name = name
+            continue
+        
+        # メニューオプション行をパース
+        menu_opt_match = _MENU_OPTION_RE.match(line)
+        if menu_opt_match and current_control_name:
+            ctrl = controls.get(current_control_name)
+            if ctrl and ctrl.get('type') == 'menu' and 'options' in ctrl:
+                idx, label = menu_opt_match.groups()
+                ctrl['options'][int(idx)] = label.strip()
+    
+    return controls
+
 
 class CameraManager:
     """カメラ管理クラス"""
     
     def __init__(self):
         self.camera: Optional[cv2.VideoCapture] = None
-        self.current_frame: Optional[object] = None
+        # キャプチャ先のリングバッファ（read()で確保済み配列へ直接書き込み、毎フレームの確保を避ける）
+        self._frame_ring: List[Optional[np.ndarray]] = [None] * FRAME_RING_SIZE
+        self._latest_slot = -1  # 最新フレームのスロット（-1: 未取得）
         self.is_running = False
-        self.capture_task: Optional[asyncio.Task] = None
+        self._capture_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        # get_controls() の解析結果キャッシュ
+        self._controls_cache: Optional[Dict] = None
+        self._controls_cache_time = 0.0
+        # コントロール設定用に開いたままにするデバイスのfd（設定毎のv4l2-ctl起動を避ける）
+        self._ctrl_fd: Optional[int] = None
+        self._ctrl_lock = threading.Lock()
         
         # カメラ設定
         self.settings = {
@@ -44,76 +151,104 @@ class CameraManager:
             logger.warning("カメラは既に起動しています")
             return
         
+        # 前回のキャプチャスレッドがread()でブロック中なら終了（カメラ解放）を待つ
+        if self._capture_thread and self._capture_thread.is_alive():
+            logger.info("前回のキャプチャスレッドの終了を待機しています")
+            await asyncio.to_thread(self._capture_thread.join, CAMERA_RECONNECT_DELAY + 2.0)
+            if self._capture_thread.is_alive():
+                logger.error("前回のキャプチャスレッドが終了しないためカメラを起動できません")
+                return
+        
         self.is_running = True
-        self.capture_task = asyncio.create_task(self._capture_loop())
+        self._stop_event.clear()
+        # read()はV4L2のDQBUFでブロックするため、イベントループ外の専用スレッドで実行
+        self._capture_thread = threading.Thread(
+            target=self._capture_loop, name="camera-capture", daemon=True
+        )
+        self._capture_thread.start()
         logger.info(f"カメラキャプチャを開始: device={CAMERA_DEVICE}, "
                    f"{self.settings['width']}x{self.settings['height']}@{self.settings['fps']}fps")
     
     async def stop(self):
         """カメラキャプチャを停止"""
         self.is_running = False
-        if self.capture_task:
-            self.capture_task.cancel()
-            try:
-                await self.capture_task
-            except asyncio.CancelledError:
-                pass
+        self._stop_event.set()
+        if self._capture_thread:
+            # 実行中のread()の完了を待つ（イベントループはブロックしない）
+            # カメラの解放はキャプチャスレッドが終了時に行う（VideoCaptureはスレッドセーフでない）
+            await asyncio.to_thread(self._capture_thread.join, CAMERA_RECONNECT_DELAY + 2.0)
+            if self._capture_thread.is_alive():
+                logger.warning("キャプチャスレッドが時間内に終了しませんでした（終了時にカメラを解放します）")
+            else:
+                self._capture_thread = None
         
-        if self.camera:
-            self.camera.release()
-            self.camera = None
+        self._close_ctrl_fd()
+        self._latest_slot = -1
         logger.info("カメラキャプチャを停止しました")
     
-    async def _capture_loop(self):
-        """カメラキャプチャループ（内部メソッド）"""
+    def _open_camera(self) -> bool:
+        """カメラを開いて設定を反映（キャプチャスレッドから呼ばれる）"""
+        logger.info(f"カメラ接続中: /dev/video{CAMERA_DEVICE}")
+        # V4L2バックエンドを明示的に指定
+        self.camera = cv2.VideoCapture(CAMERA_DEVICE, cv2.CAP_V4L2)
+        
+        # フォーマット設定を先に行う (MJPEG)
+        fourcc = cv2.VideoWriter_fourcc(*self.settings["fourcc"])
+        self.camera.set(cv2.CAP_PROP_FOURCC, fourcc)
+        
+        # バッファサイズを1に設定（遅延最小化、高解像度対応）
+        self.camera.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        
+        # 解像度とFPS設定
+        width = self.settings["width"]
+        height = self.settings["height"]
+        fps = self.settings["fps"]
+        
+        # 高解像度時はFPSを自動調整（CPU負荷軽減）
+        if width >= 1920:
+            fps = min(fps, 15)  # 1920x1080: 最大15fps
+            logger.info(f"高解像度モード: FPSを{fps}に制限")
+        elif width >= 1280:
+            fps = min(fps, 20)  # 1280x720: 最大20fps
+        
+        self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        self.camera.set(cv2.CAP_PROP_FPS, fps)
+        
+        if self.camera.isOpened():
+            # 要求したフォーマットで確定したか確認（非対応時はドライバがYUYV等に戻す）
+            actual_fourcc = int(self.camera.get(cv2.CAP_PROP_FOURCC)).to_bytes(4, 'little').decode('ascii', 'replace')
+            if actual_fourcc != self.settings["fourcc"]:
+                logger.warning(f"カメラが{self.settings['fourcc']}に非対応のため{actual_fourcc}で取得します")
+            actual_w = int(self.camera.get(cv2.CAP_PROP_FRAME_WIDTH))
+            actual_h = int(self.camera.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            actual_fps = self.camera.get(cv2.CAP_PROP_FPS)
+            logger.info(f"✅ カメラ接続成功: {actual_w}x{actual_h} @ {actual_fps}fps")
+            return True
+        
+        logger.error(f"カメラを開けませんでした: /dev/video{CAMERA_DEVICE}")
+        return False
+    
+    def _capture_loop(self):
+        """カメラキャプチャループ（専用スレッドで実行、asyncioは使わない）"""
         try:
             consecutive_failures = 0
-            while self.is_running:
-                loop_start = time.time()
+            while not self._stop_event.is_set():
                 # カメラが未接続または切断された場合、再接続を試行
                 if self.camera is None or not self.camera.isOpened():
-                    logger.info(f"カメラ接続中: /dev/video{CAMERA_DEVICE}")
-                    # V4L2バックエンドを明示的に指定
-                    self.camera = cv2.VideoCapture(CAMERA_DEVICE, cv2.CAP_V4L2)
-                    
-                    # フォーマット設定を先に行う (MJPEG)
-                    fourcc = cv2.VideoWriter_fourcc(*self.settings["fourcc"])
-                    self.camera.set(cv2.CAP_PROP_FOURCC, fourcc)
-                    
-                    # バッファサイズを1に設定（遅延最小化、高解像度対応）
-                    self.camera.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-                    
-                    # 解像度とFPS設定
-                    width = self.settings["width"]
-                    height = self.settings["height"]
-                    fps = self.settings["fps"]
-                    
-                    # 高解像度時はFPSを自動調整（CPU負荷軽減）
-                    if width >= 1920:
-                        fps = min(fps, 15)  # 1920x1080: 最大15fps
-                        logger.info(f"高解像度モード: FPSを{fps}に制限")
-                    elif width >= 1280:
-                        fps = min(fps, 20)  # 1280x720: 最大20fps
-                    
-                    self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, width)
-                    self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
-                    self.camera.set(cv2.CAP_PROP_FPS, fps)
-                    
-                    if self.camera.isOpened():
-                        actual_w = int(self.camera.get(cv2.CAP_PROP_FRAME_WIDTH))
-                        actual_h = int(self.camera.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                        actual_fps = self.camera.get(cv2.CAP_PROP_FPS)
-                        logger.info(f"✅ カメラ接続成功: {actual_w}x{actual_h} @ {actual_fps}fps")
-                        consecutive_failures = 0
-                    else:
-                        logger.error(f"カメラを開けませんでした: /dev/video{CAMERA_DEVICE}")
-                        await asyncio.sleep(CAMERA_RECONNECT_DELAY)
+                    if not self._open_camera():
+                        self._stop_event.wait(CAMERA_RECONNECT_DELAY)
                         continue
+                    consecutive_failures = 0
                 
-                # フレーム取得
-                ret, frame = self.camera.read()
+                # フレーム取得（最新の次のスロットへ書き込み、成功後にスロット番号を公開）
+                # read()はセンサーのフレーム周期でブロックするため、待機は不要
+                slot = (self._latest_slot + 1) % FRAME_RING_SIZE
+                ret, frame = self.camera.read(self._frame_ring[slot])
                 if ret:
-                    self.current_frame = frame
+                    # 解像度変更時はOpenCVが再確保した配列に差し替わる
+                    self._frame_ring[slot] = frame
+                    self._latest_slot = slot
                     consecutive_failures = 0
                 else:
                     consecutive_failures += 1
@@ -122,21 +257,28 @@ class CameraManager:
                         logger.warning("連続失敗のためカメラを再接続します")
                         self.camera.release()
                         self.camera = None
-                        await asyncio.sleep(CAMERA_RECONNECT_DELAY)
-                        continue
-
-                elapsed = time.time() - loop_start
-                sleep_time = max(0.0, (1 / self.settings["fps"]) - elapsed)
-                await asyncio.sleep(sleep_time)
-        
-        except asyncio.CancelledError:
+                        self._stop_event.wait(CAMERA_RECONNECT_DELAY)
+            
             logger.info("カメラキャプチャループが停止されました")
         except Exception as e:
             logger.error(f"カメラキャプチャエラー: {e}")
+        finally:
+            # カメラはキャプチャに使ったこのスレッドで解放する
+            if self.camera:
+                self.camera.release()
+                self.camera = None
+    
+    def get_frame(self) -> Optional[np.ndarray]:
+        """現在のフレームを取得（コピーなし、リングが一周すると上書きされる）"""
+        slot = self._latest_slot
+        if slot < 0:
+            return None
+        return self._frame_ring[slot]
     
-    def get_frame(self) -> Optional[object]:
-        """現在のフレームを取得"""
-        return self.current_frame
+    def get_frame_copy(self) -> Optional[np.ndarray]:
+        """現在のフレームのコピーを取得（画像処理など、処理中に上書きされると困る場合に使用）"""
+        frame = self.get_frame()
+        return None if frame is None else frame.copy()
     
     def is_opened(self) -> bool:
         """カメラが開いているか確認"""
@@ -144,7 +286,8 @@ class CameraManager:
     
     async def take_snapshot(self) -> Optional[Dict[str, str]]:
         """スナップショットを撮影"""
-        if self.current_frame is None:
+        frame = self.get_frame_copy()
+        if frame is None:
             logger.error("フレームが利用できません")
             return None
         
@@ -155,7 +298,7 @@ class CameraManager:
         # ディレクトリが存在しない場合は作成
         SNAPSHOTS_DIR.mkdir(parents=True, exist_ok=True)
         
-        success = cv2.imwrite(str(filepath), self.current_frame)
+        success = cv2.imwrite(str(filepath), frame)
         if success:
             logger.info(f"スナップショット保存: {filename}")
             return {
@@ -169,9 +312,10 @@ class CameraManager:
             logger.error(f"スナップショット保存失敗: {filename}")
             return None
     
-    def get_controls(self) -> Dict:
+    def get_controls(self, max_age: float = CONTROLS_CACHE_TTL) -> Dict:
         """
         カメラコントロール一覧を取得（v4l2-ctl使用、全型対応）
+        max_age秒以内に取得済みの場合はv4l2-ctlを起動せずキャッシュを返す
         
         対応する型:
         - int: 整数値（min/max/step/default/value）
@@ -198,6 +342,9 @@ class CameraManager:
         if not self.is_opened():
             raise RuntimeError("カメラが接続されていません")
         
+        if self._controls_cache is not None and time.monotonic() - self._controls_cache_time < max_age:
+            return self._controls_cache
+        
         try:
             result = subprocess.run(
                 ['v4l2-ctl', '-d', f'/dev/video{CAMERA_DEVICE}', '-L'],
@@ -207,152 +354,10 @@ class CameraManager:
                 timeout=5
             )
             
-            controls = {}
-            current_control_name = None
-            current_section = None
-            
-            for line in result.stdout.splitlines():
-                # セクションヘッダーを記録
-                if line.strip() in ('User Controls', 'Camera Controls', 'Codec Controls', 
-                                    'JPEG Compression Controls', 'Image Processing Controls',
-                                    'Image Source Controls'):
-                    current_section = line.strip()
-                    continue
-                
-                # 空行をスキップ
-                if not line.strip():
-                    continue
-                
-                # 整数型コントロール (int)
-                int_match = re.match(
-                    r'\s*(\S+)\s+0x([0-9a-f]+)\s+\(int\)\s*:\s*min=(-?\d+)\s+max=(-?\d+)\s+step=(\d+)\s+default=(-?\d+)\s+value=(-?\d+)(?:\s+flags=(.+))?',
-                    line
-                )
-                if int_match:
-                    name, ctrl_id, min_val, max_val, step, default, value, flags = int_match.groups()
-                    current_control_name = name
-                    controls[name] = {
-                        'type': 'int',
-                        'id': f'0x{ctrl_id}',
-                        'min': int(min_val),
-                        'max': int(max_val),
-                        'step': int(step),
-                        'default': int(default),
-                        'value': int(value),
-                        'flags': flags or '',
-                        'section': current_section
-                    }
-                    continue
-                
-                # 64bit整数型コントロール (int64)
-                int64_match = re.match(
-                    r'\s*(\S+)\s+0x([0-9a-f]+)\s+\(int64\)\s*:\s*min=(-?\d+)\s+max=(-?\d+)\s+step=(\d+)\s+default=(-?\d+)\s+value=(-?\d+)(?:\s+flags=(.+))?',
-                    line
-                )
-                if int64_match:
-                    name, ctrl_id, min_val, max_val, step, default, value, flags = int64_match.groups()
-                    current_control_name = name
-                    controls[name] = {
-                        'type': 'int64',
-                        'id': f'0x{ctrl_id}',
-                        'min': int(min_val),
-                        'max': int(max_val),
-                        'step': int(step),
-                        'default': int(default),
-                        'value': int(value),
-                        'flags': flags or '',
-                        'section': current_section
-                    }
-                    continue
-                
-                # menu型コントロール
-                menu_match = re.match(
-                    r'\s*(\S+)\s+0x([0-9a-f]+)\s+\(menu\)\s*:\s*min=(\d+)\s+max=(\d+)\s+default=(\d+)\s+value=(\d+)(?:\s+flags=(.+))?',
-                    line
-                )
-                if menu_match:
-                    name, ctrl_id, min_val, max_val, default, value, flags = menu_match.groups()
-                    current_control_name = name
-                    controls[name] = {
-                        'type': 'menu',
-                        'id': f'0x{ctrl_id}',
-                        'min': int(min_val),
-                        'max': int(max_val),
-                        'step': 1,
-                        'default': int(default),
-                        'value': int(value),
-                        'flags': flags or '',
-                        'options': {},
-                        'section': current_section
-                    }
-                    continue
-                
-                # bool型コントロール
-                bool_match = re.match(
-                    r'\s*(\S+)\s+0x([0-9a-f]+)\s+\(bool\)\s*:\s*default=([01])\s+value=([01])(?:\s+flags=(.+))?',
-                    line
-                )
-                if bool_match:
-                    name, ctrl_id, default, value, flags = bool_match.groups()
-                    current_control_name = name
-                    controls[name] = {
-                        'type': 'bool',
-                        'id': f'0x{ctrl_id}',
-                        'min': 0,
-                        'max': 1,
-                        'step': 1,
-                        'default': int(default),
-                        'value': int(value),
-                        'flags': flags or '',
-                        'section': current_section
-                    }
-                    continue
-                
-                # button型コントロール
-                button_match = re.match(
-                    r'\s*(\S+)\s+0x([0-9a-f]+)\s+\(button\)\s*(?:\s+flags=(.+))?',
-                    line
-                )
-                if button_match:
-                    name, ctrl_id, flags = button_match.groups()
-                    current_control_name = name
-                    controls[name] = {
-                        'type': 'button',
-                        'id': f'0x{ctrl_id}',
-                        'flags': flags or '',
-                        'section': current_section
-                    }
-                    continue
-                
-                # bitmask型コントロール
-                bitmask_match = re.match(
-                    r'\s*(\S+)\s+0x([0-9a-f]+)\s+\(bitmask\)\s*:\s*max=0x([0-9a-f]+)\s+default=0x([0-9a-f]+)\s+value=0x([0-9a-f]+)(?:\s+flags=(.+))?',
-                    line
-                )
-                if bitmask_match:
-                    name, ctrl_id, max_val, default, value, flags = bitmask_match.groups()
-                    current_control_name = name
-                    controls[name] = {
-                        'type': 'bitmask',
-                        'id': f'0x{ctrl_id}',
-                        'min': 0,
-                        'max': int(max_val, 16),
-                        'default': int(default, 16),
-                        'value': int(value, 16),
-                        'flags': flags or '',
-                        'section': current_section
-                    }
-                    continue
-                
-                # メニューオプション行をパース
-                menu_opt_match = re.match(r'^\s+(\d+):\s+(.+)$', line)
-                if menu_opt_match and current_control_name:
-                    ctrl = controls.get(current_control_name)
-                    if ctrl and ctrl.get('type') == 'menu' and 'options' in ctrl:
-                        idx, label = menu_opt_match.groups()
-                        ctrl['options'][int(idx)] = label.strip()
-            
+            controls = _parse_v4l2_controls(result.stdout)
             logger.info(f"カメラコントロール取得: {len(controls)}個")
+            self._controls_cache = controls
+            self._controls_cache_time = time.monotonic()
             return controls
         
         except subprocess.CalledProcessError as e:
@@ -383,12 +388,14 @@ class CameraManager:
             raise RuntimeError("カメラが接続されていません")
         
         # コントロールの存在と設定可能性を確認
+        ctrl_id = None
         try:
             controls = self.get_controls()
             if name not in controls:
                 raise ValueError(f"コントロール '{name}' が見つかりません")
             
             ctrl = controls[name]
+            ctrl_id = int(ctrl['id'], 16) if 'id' in ctrl else None
             
             # flagsチェック（inactive, disabled, grabbed等）
             flags = ctrl.get('flags', '')
@@ -425,6 +432,17 @@ class CameraManager:
         except Exception as e:
             logger.warning(f"コントロール検証エラー: {e}。設定を試行します。")
         
+        # VIDIOC_S_CTRLで直接設定（int64等で失敗した場合はv4l2-ctlで設定）
+        if ctrl_id is not None:
+            try:
+                self._set_control_ioctl(ctrl_id, value)
+                logger.info(f"カメラコントロール設定: {name}={value}")
+                if self._controls_cache and name in self._controls_cache:
+                    self._controls_cache[name]['value'] = value
+                return True
+            except OSError as e:
+                logger.debug(f"ioctlでの設定に失敗、v4l2-ctlで再試行: {name}: {e}")
+        
         # v4l2-ctlで設定
         try:
             result = subprocess.run(
@@ -434,6 +452,9 @@ class CameraManager:
                 text=True
             )
             logger.info(f"カメラコントロール設定: {name}={value}")
+            # キャッシュの値も更新（auto系の変更による他コントロールのflagsはTTL経過後に反映）
+            if self._controls_cache and name in self._controls_cache:
+                self._controls_cache[name]['value'] = value
             return True
         
         except subprocess.CalledProcessError as e:
@@ -445,6 +466,31 @@ class CameraManager:
             raise RuntimeError("v4l2-ctlコマンドが見つかりません")
     
     
+    def _close_ctrl_fd(self):
+        """コントロール設定用fdを閉じる"""
+        with self._ctrl_lock:
+            if self._ctrl_fd is not None:
+                os.close(self._ctrl_fd)
+                self._ctrl_fd = None
+    
+    def _set_control_ioctl(self, ctrl_id: int, value: int):
+        """VIDIOC_S_CTRLでコントロールを設定（fdは使い回し、無効になった場合のみ開き直す）"""
+        import fcntl
+        request = struct.pack('Ii', ctrl_id, value)
+        with self._ctrl_lock:
+            for retry in (False, True):
+                if self._ctrl_fd is None:
+                    self._ctrl_fd = os.open(f'/dev/video{CAMERA_DEVICE}', os.O_RDWR | os.O_NONBLOCK)
+                try:
+                    fcntl.ioctl(self._ctrl_fd, VIDIOC_S_CTRL, request)
+                    return
+                except OSError as e:
+                    # カメラの抜き差し等でfdが無効になった場合は開き直して1回だけ再試行
+                    if retry or e.errno not in (errno.ENODEV, errno.ENXIO, errno.EBADF):
+                        raise
+                    os.close(self._ctrl_fd)
+                    self._ctrl_fd = None
+    
     def reset_control(self, name: str) -> bool:
         """
         カメラコントロールをデフォルト値にリセット
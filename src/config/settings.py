@@ -29,10 +29,17 @@ GRIPPER_BAUDRATE = int(os.getenv('GRIPPER_BAUDRATE', '38400'))
 
 # WebRTC設定
 STUN_SERVER = os.getenv('STUN_SERVER', 'stun:stun.l.google.com:19302')
+# H.264ハードウェアエンコーダー（auto: 自動選択 / none: libx264 / h264_v4l2m2m, h264_nvenc）
+WEBRTC_H264_ENCODER = os.getenv('WEBRTC_H264_ENCODER', 'auto')
+# 同時接続数の上限（超えた場合は最も古い接続を閉じる、1未満の指定は1とする）
+WEBRTC_MAX_PEERS = max(1, int(os.getenv('WEBRTC_MAX_PEERS', '16')))
 
 # ログ設定
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
 
+# 開発モード（有効時はindex.htmlをリクエスト毎に再読み込み）
+DEV_MODE = os.getenv('DEV', '').lower() in ('1', 'true', 'yes')
+
 # スナップショット保存先
 SNAPSHOTS_DIR = PROJECT_ROOT / 'snapshots'
 SNAPSHOTS_DIR.mkdir(exist_ok=True)
@@ -1,7 +1,43 @@
 import minimalmodbus
+import struct
 import time
 import pdb  # デバッグ用
 
+
+def _build_crc16_table():
+    """Modbus CRC-16 (多項式0xA001) のテーブルを生成。"""
+    table = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+        table.append(crc)
+    return tuple(table)
+
+
+_CRC16_TABLE = _build_crc16_table()
+
+
+def _crc16_modbus(data):
+    """テーブル引きでModbus CRC-16を計算。"""
+    crc = 0xFFFF
+    table = _CRC16_TABLE
+    for b in data:
+        crc = (crc >> 8) ^ table[(crc ^ b) & 0xFF]
+    return crc
+
+
+def _long_to_registers(value, signed=False):
+    """32bit値を上位・下位ワードのレジスタ2個に分割 (read_long/write_longと同じ並び)。"""
+    return list(struct.unpack('>HH', struct.pack('>i' if signed else '>I', value)))
+
+
+def _registers_to_long(hi, lo, signed=False):
+    """上位・下位ワードのレジスタ2個を32bit値に結合 (_long_to_registersの逆)。"""
+    return struct.unpack('>i' if signed else '>I', struct.pack('>HH', hi, lo))[0]
+
+
+
 class CONController:
     """
     IAI社製ポジショナーコントローラをModbus RTUで操作するためのクラス。
@@ -85,6 +121,11 @@ class CONController:
             
             self.instrument.mode = minimalmodbus.MODE_RTU
             self.instrument.clear_buffers_before_each_transaction = True
+
+            # 定期読み出し用の送受信バッファ（呼び出し毎に確保しない）
+            self._frame = bytearray(8)
+            self._rx = bytearray(256)
+            self._rx_view = memoryview(self._rx)
             # self.instrument.debug = True # 詳細なログが必要な場合はコメントを外す
             print(f"コントローラ接続成功 (Port: {port})")
         except Exception as e:
@@ -97,12 +138,84 @@ class CONController:
             self.instrument.serial.close()
             print("ポートをクローズしました。")
 
+    def _rtu_read(self, register, count):
+        """
+        FC03でレジスタを読み出し、応答を self._rx に格納する。
+        送受信バッファとCRCテーブルを再利用する定期ポーリング用の軽量版。
+        """
+        ser = self.instrument.serial
+        slave = self.instrument.address
+        frame = self._frame
+        struct.pack_into('>BBHH', frame, 0, slave, 3, register, count)
+        struct.pack_into('<H', frame, 6, _crc16_modbus(memoryview(frame)[:6]))
+
+        ser.reset_input_buffer()
+        ser.write(frame)
+        expected = 5 + 2 * count
+        n = ser.readinto(self._rx_view[:expected]) or 0
+        rx = self._rx
+
+        if n >= 5 and rx[1] == 0x83:
+            raise minimalmodbus.SlaveReportedException(
+                f"スレーブ例外応答 (コード: {rx[2]})")
+        if n < expected:
+            raise minimalmodbus.NoResponseError(
+                f"応答がありません (受信 {n}/{expected} バイト)")
+        if _crc16_modbus(self._rx_view[:n - 2]) != struct.unpack_from('<H', rx, n - 2)[0]:
+            raise minimalmodbus.InvalidResponseError("CRCが一致しません")
+        if rx[0] != slave or rx[1] != 3 or rx[2] != 2 * count:
+            raise minimalmodbus.InvalidResponseError("不正な応答フレームです")
+
+    def _rtu_read_register(self, register):
+        """レジスタ1個を読み出す（read_registerの軽量版）。"""
+        self._rtu_read(register, 1)
+        return struct.unpack_from('>H', self._rx, 3)[0]
+
+    def _rtu_read_long(self, register, signed=False):
+        """32bit値（レジスタ2個）を読み出す（read_longの軽量版）。"""
+        self._rtu_read(register, 2)
+        return struct.unpack_from('>i' if signed else '>I', self._rx, 3)[0]
+
     def check_status_bit(self, register, bit_position):
         """指定したレジスタの特定ビットが1か0かを確認。"""
-        status = self.instrument.read_register(register, functioncode=3)
+        status = self._rtu_read_register(register)
         # print(bin(status)) # デバッグ用: 現在の拡張ステータスを表示
         return (status >> bit_position) & 1
 
+    # ポジションテーブル1行のうち書き込み対象の範囲: PCMD(+0)〜CTLF(+14)
+    POS_ROW_WRITE_COUNT = 15
+    # ポジションテーブル1行のアドレス幅
+    POS_ROW_STRIDE = 16
+    # 一括読み出しで1回のFC03にまとめる行数 (7行 = 111レジスタ、FC03上限125以内)
+    POS_TABLE_ROWS_PER_READ = 7
+
+    # 一括読み出し範囲: PNOW(0x9000)〜CNOW(0x900C-0x900D) の14レジスタ
+    STATUS_BLOCK_COUNT = 14
+
+    def get_status_block(self):
+        """
+        位置・アラーム・ステータス・電流値を1回のFC03でまとめて読み出す。
+        返値: position_mm, alarm, device_status, ext_status, current_mA の辞書
+        """
+        self._rtu_read(self.REG_CURRENT_POS, self.STATUS_BLOCK_COUNT)
+        rx = self._rx
+        base = self.REG_CURRENT_POS
+
+        def offset(reg):
+            return 3 + 2 * (reg - base)
+
+        return {
+            'position_mm': struct.unpack_from('>i', rx, offset(self.REG_CURRENT_POS))[0] / 100.0,
+            'alarm': struct.unpack_from('>H', rx, offset(self.REG_CURRENT_ALARM))[0],
+            'device_status': struct.unpack_from('>H', rx, offset(self.REG_DEVICE_STATUS))[0],
+            'ext_status': struct.unpack_from('>H', rx, offset(self.REG_EXT_STATUS))[0],
+            'current_mA': struct.unpack_from('>I', rx, offset(self.REG_CURRENT_VALUE))[0],
+        }
+
+    def get_device_status(self):
+        """デバイスステータスレジスタ1 (DSS1) の生値を取得。"""
+        return self._rtu_read_register(self.REG_DEVICE_STATUS)
+
     def wait_for_motion_to_stop(self, timeout=10):
         """移動中(MOVE)信号がOFFになるのを待つ。"""
         start_time = time.time()
@@ -144,12 +257,16 @@ class CONController:
         self.instrument.write_register(self.REG_CONTROL, 0, functioncode=6)
         print("   サーボOFF完了。")
 
-    def home(self, timeout=20):
-        """原点復帰を実行し、物理的に完了するまで待つ。"""
+    def start_home(self):
+        """原点復帰指令のみを送信（完了は待たない）。"""
         print("\n2. 原点復帰を開始します...")
         self.instrument.write_register(self.REG_CONTROL, self.VAL_SERVO_ON, functioncode=6)
         self.instrument.write_register(self.REG_CONTROL, self.VAL_HOME, functioncode=6)
 
+    def home(self, timeout=20):
+        """原点復帰を実行し、物理的に完了するまで待つ。"""
+        self.start_home()
+
         if not self.wait_for_motion_to_stop(timeout):
             raise RuntimeError("[Error] 原点復帰がタイムアウトしました。")
         self.instrument.write_register(self.REG_CONTROL, self.VAL_SERVO_ON, functioncode=6)
@@ -188,24 +305,26 @@ class CONController:
         print(f"\n【データ書込】ポジションNo.{position_number} のデータを書き込みます...")
         try:
             base_addr = self.POS_TABLE_START + (16 * position_number)
-            # 各値を変換して書き込み
-            self.instrument.write_long(base_addr + 0, int(position_mm * 100), signed=True)
-            self.instrument.write_long(base_addr + 2, int(width_mm * 100), signed=False)
-            self.instrument.write_long(base_addr + 4, int(speed_mm_s * 100), signed=False)
-            self.instrument.write_register(base_addr + 10, int(accel_g * 100))
-            self.instrument.write_register(base_addr + 11, int(decel_g * 100))
+            # 1. 行全体 (オフセット+0〜+14) を1回で読み出す
+            #    ゾーン境界(+6〜+9)・位置決め停止電流(+13)・CTLFの他ビットは現在値を保持する
+            row = self.instrument.read_registers(base_addr, self.POS_ROW_WRITE_COUNT, functioncode=3)
+
+            # 2. 各値を変換して行バッファに格納
+            row[0:2] = _long_to_registers(int(position_mm * 100), signed=True)
+            row[2:4] = _long_to_registers(int(width_mm * 100))
+            row[4:6] = _long_to_registers(int(speed_mm_s * 100))
+            row[10] = int(accel_g * 100)
+            row[11] = int(decel_g * 100)
             # 押付け電流
             push_val = int(255 * push_current_percent / 100) if is_push_move else 0
-            self.instrument.write_register(base_addr + 12, push_val)
+            row[12] = push_val
             # # 制御フラグ
             # ctl_flag = 0b0000
             # if is_push_move:
             #     ctl_flag = 0b0010 if not is_closing_push else 0b0110
             # self.instrument.write_register(base_addr + 14, ctl_flag)
-            # 1. 現在のCTLFレジスタの値を読み出す (オフセット+14)
-            current_ctlf = self.instrument.read_register(base_addr + 14, functioncode=3)
-            new_ctlf = current_ctlf
-            # 2. 変更したいビットだけを操作する
+            # CTLFは変更したいビットだけを操作する
+            new_ctlf = row[14]
             if is_push_move:
                 # PUSHビット(ビット1)をONにする
                 new_ctlf = new_ctlf | 0b0010
@@ -219,9 +338,10 @@ class CONController:
             else:
                 # PUSHとDIRビットをOFFにする
                 new_ctlf = new_ctlf & ~0b0110
+            row[14] = new_ctlf
 
-            # 3. 変更後の値を書き戻す
-            self.instrument.write_register(base_addr + 14, new_ctlf)
+            # 3. 行全体をFC16で1回で書き戻す
+            self.instrument.write_registers(base_addr, row)
             
             # 変数 ctl_flag を new_ctlf に変更
             ctl_flag = new_ctlf
@@ -247,14 +367,18 @@ class CONController:
             return False
 
 
-    def move_to_pos(self, position_number, timeout=15):
-        """指定したポジション番号へ移動し、物理的に完了するまで待つ。"""
+    def start_move(self, position_number):
+        """ポジション移動指令のみを送信（完了は待たない）。"""
         print(f"\n3. ポジションテーブル No.{position_number} へ移動します...")
         self.instrument.write_register(self.REG_POS_SELECT, position_number, functioncode=6)
         print(f"   移動先 ({position_number}) を設定しました。")
         self.instrument.write_register(self.REG_CONTROL, self.VAL_SERVO_ON, functioncode=6)
         self.instrument.write_register(self.REG_CONTROL, self.VAL_START, functioncode=6)
 
+    def move_to_pos(self, position_number, timeout=15):
+        """指定したポジション番号へ移動し、物理的に完了するまで待つ。"""
+        self.start_move(position_number)
+
         if not self.wait_for_motion_to_stop(timeout):
              raise RuntimeError("[Error] 位置決め移動がタイムアウトしました。")
 
@@ -267,32 +391,10 @@ class CONController:
         try:
             base_addr = self.POS_TABLE_START + (16 * position_number)
             
-            # 各データを仕様に合わせて読み出し
+            # 行全体 (オフセット+0〜+14) を1回で読み出す
             # 計算式：1000H ＋（16 × ポジションNo.）H ＋ アドレス（オフセット値）H
-            # 目標位置
-            pcmd = self.instrument.read_long(base_addr + 0, functioncode=3, signed=True) / 100.0
-            # 位置決め幅
-            inp = self.instrument.read_long(base_addr + 2, functioncode=3, signed=False) / 100.0
-            # 速度指令
-            vcmd = self.instrument.read_long(base_addr + 4, functioncode=3, signed=False) / 100.0
-            # 加速度指令
-            acmd = self.instrument.read_register(base_addr + 10, functioncode=3) / 100.0
-            # 減速度指令
-            dcmd = self.instrument.read_register(base_addr + 11, functioncode=3) / 100.0
-            # 押付け時電流制限値
-            ppow = self.instrument.read_register(base_addr + 12, functioncode=3)
-            # 制御フラグ指定
-            ctlf = self.instrument.read_register(base_addr + 14, functioncode=3)
-
-            pos_data = {
-                'position_mm': pcmd,
-                'width_mm': inp,
-                'speed_mm_s': vcmd,
-                'accel_g': acmd,
-                'decel_g': dcmd,
-                'push_current_percent': round(ppow * 100 / 255), # %に変換
-                'control_flag_hex': f"{ctlf:04X}"
-            }
+            row = self.instrument.read_registers(base_addr, self.POS_ROW_WRITE_COUNT, functioncode=3)
+            pos_data = self._position_row_to_dict(row)
             print("   読み出し成功！")
             for key, value in pos_data.items():
                 print(f"     - {key:<22}: {value}")
@@ -301,10 +403,50 @@ class CONController:
             print(f"   [Error] ポジションデータの読み出しに失敗しました: {e}")
             return None
 
+    @staticmethod
+    def _position_row_to_dict(row):
+        """ポジションテーブル1行分のレジスタ値 (+0〜+14) を辞書に変換。"""
+        return {
+            'position_mm': _registers_to_long(row[0], row[1], signed=True) / 100.0,  # 目標位置
+            'width_mm': _registers_to_long(row[2], row[3]) / 100.0,   # 位置決め幅
+            'speed_mm_s': _registers_to_long(row[4], row[5]) / 100.0, # 速度指令
+            'accel_g': row[10] / 100.0,  # 加速度指令
+            'decel_g': row[11] / 100.0,  # 減速度指令
+            'push_current_percent': round(row[12] * 100 / 255), # 押付け時電流制限値 (%に変換)
+            'control_flag_hex': f"{row[14]:04X}"  # 制御フラグ指定
+        }
+
+    def get_position_table(self, start=0, count=64):
+        """
+        ポジションテーブルを複数行まとめて読み出す。
+        POS_TABLE_ROWS_PER_READ 行ずつ1回のFC03で読み出す (64行で10回)。
+        返値: ポジション番号 ('position') 付きのポジションデータ辞書のリスト
+        """
+        rows = []
+        stride = self.POS_ROW_STRIDE
+        max_regs = stride * (self.POS_TABLE_ROWS_PER_READ - 1) + self.POS_ROW_WRITE_COUNT
+        # 応答が長い (最大227バイト) ため、その長さに合わせたタイムアウトで読み出す
+        # (タイムアウト・CRCエラー時も以降の通信に長いタイムアウトを残さないよう必ず元に戻す)
+        prev_timeout = self.instrument.serial.timeout
+        try:
+            self.instrument.serial.timeout = self._calculate_timeout(self.baudrate, response_bytes=5 + 2 * max_regs)
+            for first in range(start, start + count, self.POS_TABLE_ROWS_PER_READ):
+                n = min(self.POS_TABLE_ROWS_PER_READ, start + count - first)
+                regs = self.instrument.read_registers(
+                    self.POS_TABLE_START + stride * first,
+                    stride * (n - 1) + self.POS_ROW_WRITE_COUNT,
+                    functioncode=3)
+                for i in range(n):
+                    row = regs[stride * i:stride * i + self.POS_ROW_WRITE_COUNT]
+                    rows.append({'position': first + i, **self._position_row_to_dict(row)})
+        finally:
+            self.instrument.serial.timeout = prev_timeout
+        return rows
+
     def get_current_position(self):
         """現在位置をmm単位で取得。"""
         # print("\n4. 現在位置を読み出します...")
-        pos_raw = self.instrument.read_long(self.REG_CURRENT_POS, functioncode=3, signed=True)
+        pos_raw = self._rtu_read_long(self.REG_CURRENT_POS, signed=True)
         pos_mm = pos_raw / 100.0
         # print(f"   読み出し成功！ 現在位置: {pos_mm:.2f} mm")
         return pos_mm
@@ -313,7 +455,7 @@ class CONController:
         """モーターの現在電流値をmA単位で取得。(資料 p.135)"""
         # print("\n4c. 現在のモーター電流値を読み出します...")
         try:
-            current_raw = self.instrument.read_long(self.REG_CURRENT_VALUE, functioncode=3, signed=False)
+            current_raw = self._rtu_read_long(self.REG_CURRENT_VALUE)
             # print(f"   読み出し成功！ 現在電流値: {current_raw} mA")
             return current_raw
         except Exception as e:
@@ -323,7 +465,7 @@ class CONController:
     def get_current_alarm(self):
         """現在発生中のアラームコードを取得。"""
         # print("\n4b. 現在発生中のアラームを確認します...")
-        alarm_code = self.instrument.read_register(self.REG_CURRENT_ALARM, functioncode=3)
+        alarm_code = self._rtu_read_register(self.REG_CURRENT_ALARM)
         if alarm_code == 0:
             # print("   アラームはありません。正常です。")
             pass
@@ -5,7 +5,9 @@ IAI製グリッパーの制御を提供（CONControllerをラップ）
 import asyncio
 import logging
 import time
-from typing import Optional, Dict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Optional, Dict, List
 from pathlib import Path
 
 from src.gripper.controller import CONController
@@ -13,6 +15,16 @@ from src.config.settings import GRIPPER_PORT, GRIPPER_SLAVE_ADDR, GRIPPER_BAUDRA
 
 logger = logging.getLogger(__name__)
 
+# モニターのステータス読み取り間隔 [秒]
+MONITOR_INTERVAL = 0.2
+# 動作完了待ちの間のモニター読み取り間隔 [秒]（38400bpsで1回の読み取りは約10ms）
+MOTION_POLL_INTERVAL = 0.02
+
+
+def _bit_on(value: int, bit_position: int) -> bool:
+    """レジスタ値の指定ビットがONか"""
+    return bool((value >> bit_position) & 1)
+
 
 class GripperManager:
     """グリッパー管理クラス"""
@@ -36,7 +48,7 @@ class GripperManager:
         for attempt in range(max_retries):
             try:
                 async with self._modbus_lock:
-                    result = await asyncio.to_thread(func, *args, **kwargs)
+                    result = await self._run_serial(func, *args, **kwargs)
                     return result
             except Exception as e:
                 last_exception = e
@@ -69,7 +81,7 @@ class GripperManager:
         for attempt in range(max_retries):
             try:
                 async with self._modbus_lock:
-                    result = await asyncio.to_thread(func, *args, **kwargs)
+                    result = await self._run_serial(func, *args, **kwargs)
                     # 書き込み後、RC コントローラーが次のクエリー受信に備えるまで待機（1ms）
                     await asyncio.sleep(0.002)  # 安全のため2ms待機
                     return result
@@ -84,17 +96,39 @@ class GripperManager:
         logger.error(f"Modbus書き込み失敗（{max_retries}回リトライ後）: {last_exception}")
         raise last_exception
 
-    def __init__(self):
+    def __init__(
+        self,
+        port: str = GRIPPER_PORT,
+        slave_address: int = GRIPPER_SLAVE_ADDR,
+        baudrate: int = GRIPPER_BAUDRATE,
+    ):
+        self.port = port
+        self.slave_address = slave_address
+        self.baudrate = baudrate
         self._modbus_lock = asyncio.Lock()  # Modbus通信の排他制御
+        # シリアルバス専用の単一ワーカー（投入順にトランザクションを直列化）
+        self._serial_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gripper-modbus")
         self.controller: Optional[CONController] = None
         self.is_connected = False
         
         # キャッシュ用変数（定期的にバックグラウンドで更新）
         self._cached_current: Optional[int] = None  # 電流値 (mA)
         self._cached_position: Optional[float] = None  # 位置 (mm)
+        self._cached_status: Optional[Dict] = None  # /status用のステータス
         self._cache_timestamp: float = 0  # キャッシュ更新時刻
         self._monitor_task: Optional[asyncio.Task] = None  # モニタータスク
+        # 動作指令（原点復帰・移動）の送信完了回数。モニターの読み取りが指令より後のものか判定する
+        self._command_seq = 0
+        # モニターが読んだステータスを受け取る完了待ちのコールバック (block, 読み取り開始時の_command_seq)
+        self._status_listeners: List[Callable[[Dict, int], None]] = []
+        # 完了待ちの開始時にモニターの待機を打ち切り、すぐに読み取らせる
+        self._monitor_wakeup = asyncio.Event()
     
+    async def _run_serial(self, func, *args, **kwargs):
+        """Modbus呼び出しをシリアルバス専用ワーカーで実行"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._serial_executor, partial(func, *args, **kwargs))
+
     async def connect(self):
         """グリッパーに接続"""
         if self.is_connected:
@@ -102,14 +136,16 @@ class GripperManager:
             return True
         
         try:
-            logger.info(f"グリッパー接続中: {GRIPPER_PORT}")
-            self.controller = CONController(
-                port=GRIPPER_PORT,
-                slave_address=GRIPPER_SLAVE_ADDR,
-                baudrate=GRIPPER_BAUDRATE
+            logger.info(f"グリッパー接続中: {self.port}")
+            # シリアルポートのオープンは別スレッドで実行（イベントループをブロックしない）
+            self.controller = await self._run_serial(
+                CONController,
+                port=self.port,
+                slave_address=self.slave_address,
+                baudrate=self.baudrate
             )
             self.is_connected = True
-            logger.info(f"✅ グリッパー接続成功: {GRIPPER_PORT}")
+            logger.info(f"✅ グリッパー接続成功: {self.port}")
             await self._start_monitor()
             return True
         except Exception as e:
@@ -122,30 +158,32 @@ class GripperManager:
         """グリッパーから切断"""
         await self._stop_monitor()
         
-        # サーボがONの場合はOFFにする
-        if self.controller and self.is_connected:
-            try:
-                servo_on = await asyncio.to_thread(
-                    self.controller.check_status_bit,
-                    self.controller.REG_DEVICE_STATUS,
-                    self.controller.BIT_SERVO_READY
-                )
-                if servo_on:
-                    logger.info("サーボOFFにしています...")
-                    await asyncio.to_thread(self.controller.servo_off)
-                    logger.info("サーボOFF完了")
-            except Exception as e:
-                logger.warning(f"サーボOFF処理エラー: {e}")
-        
-        if self.controller:
-            try:
-                self.controller.close()
-                logger.info("グリッパーを切断しました")
-            except Exception as e:
-                logger.error(f"グリッパー切断エラー: {e}")
-        
-        self.controller = None
-        self.is_connected = False
+        # 実行中のAPIリクエストの通信が終わるまで待ってから切断する
+        async with self._modbus_lock:
+            # サーボがONの場合はOFFにする
+            if self.controller and self.is_connected:
+                try:
+                    servo_on = await self._run_serial(
+                        self.controller.check_status_bit,
+                        self.controller.REG_DEVICE_STATUS,
+                        self.controller.BIT_SERVO_READY
+                    )
+                    if servo_on:
+                        logger.info("サーボOFFにしています...")
+                        await self._run_serial(self.controller.servo_off)
+                        logger.info("サーボOFF完了")
+                except Exception as e:
+                    logger.warning(f"サーボOFF処理エラー: {e}")
+            
+            if self.controller:
+                try:
+                    await self._run_serial(self.controller.close)
+                    logger.info("グリッパーを切断しました")
+                except Exception as e:
+                    logger.error(f"グリッパー切断エラー: {e}")
+            
+            self.controller = None
+            self.is_connected = False
     
 
     async def _monitor_loop(self):
@@ -154,30 +192,99 @@ class GripperManager:
         try:
             while self.is_connected:
                 try:
-                    # 電流値を取得
-                    current = await self._modbus_read_with_retry(
-                        self.controller.get_current_mA
-                    )
-                    # 位置を取得
-                    position = await self._modbus_read_with_retry(
-                        self.controller.get_current_position
+                    # 読み取り開始時点の指令番号を記録（指令前に読み始めた値を完了判定に使わない）
+                    seq = self._command_seq
+                    # 位置・アラーム・ステータス・電流値を1回の読み出しで取得
+                    block = await self._modbus_read_with_retry(
+                        self.controller.get_status_block
                     )
                     
-                    # キャッシュを更新
-                    self._cached_current = current
-                    self._cached_position = position
-                    self._cache_timestamp = time.time()
+                    self._apply_status_block(block, seq)
                     
                 except Exception as e:
                     logger.warning(f"モニター更新エラー: {e}")
                 
-                # 200ms待機
-                await asyncio.sleep(0.2)
+                # 完了待ちがある間は短い間隔で読み取る（バスを読むのはモニターのみ）
+                interval = MOTION_POLL_INTERVAL if self._status_listeners else MONITOR_INTERVAL
+                try:
+                    await asyncio.wait_for(self._monitor_wakeup.wait(), timeout=interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._monitor_wakeup.clear()
         except asyncio.CancelledError:
             logger.info("グリッパーモニタータスクをキャンセル")
         except Exception as e:
             logger.error(f"モニタータスクエラー: {e}")
     
+    def _apply_status_block(self, block: Dict, seq: int):
+        """一括読み出し結果でキャッシュを更新し、完了待ちへ通知"""
+        self._cached_current = block["current_mA"]
+        self._cached_position = block["position_mm"]
+        self._cached_status = self._status_from_block(block)
+        self._cache_timestamp = time.time()
+        for listener in list(self._status_listeners):
+            listener(block, seq)
+    
+    def _status_from_block(self, block: Dict) -> Dict:
+        """一括読み出し結果から/status用の辞書を作成"""
+        position_mm = block["position_mm"]
+        return {
+            "status": "ok",
+            "position": int(position_mm * 100),  # mm -> 0.01mm単位に変換
+            "position_mm": position_mm,
+            "alarm": block["alarm"],
+            "servo_on": (block["device_status"] >> self.controller.BIT_SERVO_READY) & 1
+        }
+
+    async def _send_motion_command(self, func, *args):
+        """動作指令を送信し、指令番号を進める（以降に読み始めたステータスのみ完了判定に使う）"""
+        await self._modbus_write_with_retry(func, *args)
+        self._command_seq += 1
+        return self._command_seq
+
+    async def _wait_for_motion(
+        self,
+        command_seq: int,
+        is_started: Callable[[Dict], bool],
+        is_done: Callable[[Dict], bool],
+        timeout: float,
+    ) -> bool:
+        """
+        指令後の動作完了をモニタータスクの読み取りに相乗りして待機（バスへの追加読み取りなし）
+        
+        指令前の完了状態が残っていても完了としないよう、指令後に読み始めた値で
+        is_startedを一度確認してからis_doneを判定する。
+        
+        Args:
+            command_seq: _send_motion_commandの返値
+            is_started: 動作開始を示すステータスか
+            is_done: 動作完了を示すステータスか
+            timeout: タイムアウト（秒）
+        
+        Returns:
+            タイムアウト前に完了すればTrue
+        """
+        done = asyncio.get_running_loop().create_future()
+        started = False
+
+        def on_status(block: Dict, seq: int):
+            nonlocal started
+            if seq < command_seq or done.done():
+                return
+            started = started or is_started(block)
+            if started and is_done(block):
+                done.set_result(True)
+
+        self._status_listeners.append(on_status)
+        self._monitor_wakeup.set()
+        try:
+            await asyncio.wait_for(done, timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._status_listeners.remove(on_status)
+
     async def _start_monitor(self):
         """モニタータスクを開始"""
         if self._monitor_task is None or self._monitor_task.done():
@@ -195,35 +302,24 @@ class GripperManager:
             self._monitor_task = None
             logger.info("グリッパーモニターを停止しました")
 
-    async def get_status(self) -> Dict:
-        """グリッパーステータスを取得（非同期読み取り、ロック使用）"""
+    async def get_status(self, max_age: float = 0.5) -> Dict:
+        """
+        グリッパーステータスを取得
+        
+        モニタータスクのキャッシュがmax_age秒以内ならModbus通信なしで返す。
+        古い場合のみ直接読み取る（非同期読み取り、ロック使用）。
+        """
         if not self.is_connected or not self.controller:
             raise RuntimeError("グリッパーが接続されていません")
         
+        if self._cached_status is not None and time.time() - self._cache_timestamp <= max_age:
+            return dict(self._cached_status)
+        
         async with self._modbus_lock:
             try:
-                # controller.pyのメソッドを使用（非同期実行）
-                position_mm = await asyncio.to_thread(
-                    self.controller.get_current_position
-                )
-                alarm = await asyncio.to_thread(
-                    self.controller.get_current_alarm
-                )
-                servo_on = await asyncio.to_thread(
-                    self.controller.check_status_bit,
-                    self.controller.REG_DEVICE_STATUS,
-                    self.controller.BIT_SERVO_READY
-                )
-                
-                position = int(position_mm * 100)  # mm -> 0.01mm単位に変換
-                
-                return {
-                    "status": "ok",
-                    "position": position,
-                    "position_mm": position_mm,
-                    "alarm": alarm,
-                    "servo_on": servo_on
-                }
+                # 位置・アラーム・ステータスを1回の読み出しで取得
+                block = await self._run_serial(self.controller.get_status_block)
+                return self._status_from_block(block)
             except Exception as e:
                 logger.error(f"ステータス取得エラー: {e}")
                 # エラー時もレスポンスを返す（main_webrtc_fixed.py方式）
@@ -243,7 +339,7 @@ class GripperManager:
         
         async with self._modbus_lock:
             # 別スレッドで実行してイベントループをブロックしない
-            await asyncio.to_thread(self.controller.servo_on)
+            await self._run_serial(self.controller.servo_on)
         logger.info("サーボON")
     
     async def servo_off(self):
@@ -253,7 +349,7 @@ class GripperManager:
         
         async with self._modbus_lock:
             # 別スレッドで実行してイベントループをブロックしない
-            await asyncio.to_thread(self.controller.servo_off)
+            await self._run_serial(self.controller.servo_off)
         logger.info("サーボOFF")
     
     async def home(self):
@@ -261,10 +357,29 @@ class GripperManager:
         if not self.is_connected or not self.controller:
             raise RuntimeError("グリッパーが接続されていません")
         
-        async with self._modbus_lock:
-            # 別スレッドで実行してイベントループをブロックしない
-            await asyncio.to_thread(self.controller.home)
-        logger.info("原点復帰を実行")
+        ctrl = self.controller
+        command_seq = await self._send_motion_command(ctrl.start_home)
+        logger.info("原点復帰を開始")
+        
+        # 完了待ちはモニタータスクのステータス読み取りに相乗り（ロックは保持しない）
+        # 指令前のHEND=1で即完了とならないよう、HEND=0または移動中を確認してからHEND=1を待つ
+        if not await self._wait_for_motion(
+            command_seq,
+            is_started=lambda b: (not _bit_on(b["device_status"], ctrl.BIT_HOME_END)
+                                  or _bit_on(b["ext_status"], ctrl.BIT_MOVE)),
+            is_done=lambda b: _bit_on(b["device_status"], ctrl.BIT_HOME_END),
+            timeout=20.0,
+        ):
+            raise RuntimeError("原点復帰がタイムアウトしました（HEND信号がONになりませんでした）")
+        
+        # HOME指令ビットを戻す（controller.homeと同じ後処理）
+        await self._modbus_write_with_retry(
+            self.controller.instrument.write_register,
+            self.controller.REG_CONTROL,
+            self.controller.VAL_SERVO_ON,
+            functioncode=6
+        )
+        logger.info("原点復帰完了")
     
     async def move_to_position(self, position_number: int):
         """指定ポジションに移動"""
@@ -274,9 +389,19 @@ class GripperManager:
         if position_number < 0 or position_number > 63:
             raise ValueError("ポジション番号は0-63の範囲で指定してください")
         
-        async with self._modbus_lock:
-            # 別スレッドで実行してイベントループをブロックしない
-            await asyncio.to_thread(self.controller.move_to_pos, position_number)
+        # 指令の送信のみロックを保持し、完了待ちの間は他のリクエストがバスを使えるようにする
+        ctrl = self.controller
+        command_seq = await self._send_motion_command(ctrl.start_move, position_number)
+        # 前回の位置決めのPEND=1で即完了とならないよう、PEND=0または移動中を確認してから完了を待つ
+        if not await self._wait_for_motion(
+            command_seq,
+            is_started=lambda b: (not _bit_on(b["device_status"], ctrl.BIT_POS_END)
+                                  or _bit_on(b["ext_status"], ctrl.BIT_MOVE)),
+            is_done=lambda b: (_bit_on(b["device_status"], ctrl.BIT_POS_END)
+                               and not _bit_on(b["ext_status"], ctrl.BIT_MOVE)),
+            timeout=15.0,
+        ):
+            raise RuntimeError("位置決め移動がタイムアウトしました")
         logger.info(f"ポジション{position_number}に移動")
     
     async def get_position_table(self, position_number: int) -> Optional[Dict]:
@@ -289,12 +414,24 @@ class GripperManager:
         
         async with self._modbus_lock:
             try:
-                data = await asyncio.to_thread(self.controller.get_position_data, position_number)
+                data = await self._run_serial(self.controller.get_position_data, position_number)
                 return data
             except Exception as e:
                 logger.error(f"ポジションデータ取得エラー: {e}")
                 raise
     
+    async def get_all_position_tables(self) -> List[Dict]:
+        """ポジションテーブル全64行を取得（7行ずつまとめて読み出し）"""
+        if not self.is_connected or not self.controller:
+            raise RuntimeError("グリッパーが接続されていません")
+        
+        async with self._modbus_lock:
+            try:
+                return await self._run_serial(self.controller.get_position_table, 0, 64)
+            except Exception as e:
+                logger.error(f"ポジションテーブル一括取得エラー: {e}")
+                raise
+    
     async def update_position_table(self, position_number: int, data: Dict):
         """ポジションテーブルのデータを更新"""
         if not self.is_connected or not self.controller:
@@ -304,7 +441,7 @@ class GripperManager:
             raise ValueError("ポジション番号は0-63の範囲で指定してください")
         
         async with self._modbus_lock:
-            await asyncio.to_thread(
+            await self._run_serial(
                 self.controller.set_position_data,
                 position_number,
                 position_mm=data.get("position"),
@@ -394,18 +531,18 @@ class GripperManager:
             try:
                 # 電流値読み取り（キャッシュ優先）
                 cached_current = await self.get_cached_current(max_age=0.5)
-                current = cached_current if cached_current is not None else await asyncio.to_thread(
+                current = cached_current if cached_current is not None else await self._run_serial(
                     self.controller.get_current_mA
                 )
                 
                 # 現在位置読み取り（キャッシュ優先、既にmm単位）
                 cached_position = await self.get_cached_position(max_age=0.5)
-                position_mm = cached_position if cached_position is not None else await asyncio.to_thread(
+                position_mm = cached_position if cached_position is not None else await self._run_serial(
                     self.controller.get_current_position
                 )
                 
                 # MOVEビット（移動中信号）をcontroller.check_status_bitで確認
-                move = await asyncio.to_thread(
+                move = await self._run_serial(
                     self.controller.check_status_bit,
                     self.controller.REG_EXT_STATUS,
                     self.controller.BIT_MOVE
@@ -413,7 +550,7 @@ class GripperManager:
                 move = bool(move)
                 
                 # PSFL（押付け空振りフラグ）をcontroller.check_status_bitで確認
-                psfl = await asyncio.to_thread(
+                psfl = await self._run_serial(
                     self.controller.check_status_bit,
                     self.controller.REG_DEVICE_STATUS,
                     self.controller.BIT_PUSH_MISS
@@ -0,0 +1,14 @@
+"""
+FastAPIレスポンス共通設定
+各アプリのdefault_response_classに使用するJSONレスポンスクラスを提供
+"""
+from fastapi.responses import JSONResponse
+
+# JSONエンコードはorjsonがあれば使用（オプショナル、なければ標準json）
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as DefaultJSONResponse
+except ImportError:
+    DefaultJSONResponse = JSONResponse
+
+__all__ = ["DefaultJSONResponse"]
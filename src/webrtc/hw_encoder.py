@@ -0,0 +1,138 @@
+"""
+H.264ハードウェアエンコーダー設定モジュール
+aiortcのH.264エンコードをlibx264(CPU)からハードウェアエンコーダーへ切り替える
+"""
+import fractions
+import inspect
+import logging
+from typing import Optional
+
+import aiortc
+import av
+from aiortc import RTCRtpSender
+from aiortc.codecs import h264
+
+logger = logging.getLogger(__name__)
+
+# 自動選択時に試す順序（Raspberry Pi/Jetson: v4l2m2m、NVIDIA: NVENC）
+HW_ENCODER_CANDIDATES = ("h264_v4l2m2m", "h264_nvenc")
+
+# エンコーダー毎の追加オプション（低遅延・CBR）
+HW_ENCODER_OPTIONS = {
+    "h264_nvenc": {
+        "preset": "p1",
+        "tune": "ll",
+        "zerolatency": "1",
+        "rc": "cbr",
+        "profile": "baseline",
+    },
+    "h264_v4l2m2m": {},
+}
+
+# 内部キューで出力が遅れるエンコーダー（aiortcのcodec_buffering: ptsが変わるまでパケットを溜める）
+# v4l2m2mはh264_omxと同じM2M方式、NVENCはzerolatency指定で入力毎に出力されるため対象外
+BUFFERING_ENCODERS = ("h264_v4l2m2m",)
+
+_hw_encoder: Optional[str] = None
+# aiortc 1.12以降には存在しない（エンコーダーはlibx264固定）
+_original_create_encoder_context = getattr(h264, "create_encoder_context", None)
+
+
+def _supports_encoder_hook() -> bool:
+    """インストール済みのaiortcがcreate_encoder_context経由でh264_omxを試すか"""
+    if _original_create_encoder_context is None:
+        return False
+    try:
+        # 1.11はcreate_encoder_contextが残っているがh264_omxを試さないため置き換えても使われない
+        return "h264_omx" in inspect.getsource(h264.H264Encoder)
+    except (OSError, TypeError):
+        return False
+
+
+def _is_encoder_available(name: str) -> bool:
+    """FFmpegにエンコーダーが組み込まれているか確認"""
+    try:
+        av.codec.Codec(name, "w")
+        return True
+    except Exception:
+        return False
+
+
+def _create_encoder_context(codec_name: str, width: int, height: int, bitrate: int):
+    """
+    aiortcのcreate_encoder_contextの置き換え
+
+    aiortcは最初にh264_omxを試し、失敗するとlibx264にフォールバックする。
+    h264_omxの代わりにハードウェアエンコーダーを開き、失敗時は例外でlibx264に任せる。
+    """
+    global _hw_encoder
+
+    if codec_name != "h264_omx" or _hw_encoder is None:
+        return _original_create_encoder_context(codec_name, width, height, bitrate)
+
+    try:
+        codec = av.CodecContext.create(_hw_encoder, "w")
+        codec.width = width
+        codec.height = height
+        codec.bit_rate = bitrate
+        codec.pix_fmt = "yuv420p"
+        codec.framerate = fractions.Fraction(h264.MAX_FRAME_RATE, 1)
+        codec.time_base = fractions.Fraction(1, h264.MAX_FRAME_RATE)
+        codec.options = dict(HW_ENCODER_OPTIONS.get(_hw_encoder, {}))
+        codec.open()
+    except Exception as e:
+        # デバイスがない等: 以降はハードウェアを試さない（解像度・ビットレート変更毎の再試行を避ける）
+        logger.warning(f"{_hw_encoder}を開けないためlibx264を使用します: {e}")
+        _hw_encoder = None
+        raise
+    return codec, _hw_encoder in BUFFERING_ENCODERS
+
+
+def install_hw_h264_encoder(name: str = "auto") -> Optional[str]:
+    """
+    aiortcのH.264エンコーダーにハードウェアエンコーダーを組み込む
+
+    Args:
+        name: "auto"（候補から自動選択）、"none"（無効）、またはエンコーダー名
+
+    Returns:
+        使用するエンコーダー名（ハードウェアを使わない場合はNone）
+    """
+    global _hw_encoder
+
+    name = (name or "none").lower()
+    if name in ("none", "off", "libx264"):
+        _hw_encoder = None
+        return None
+
+    if not _supports_encoder_hook():
+        _hw_encoder = None
+        logger.info(f"aiortc {aiortc.__version__} はH.264エンコーダーを差し替えできません（libx264を使用）")
+        return None
+
+    candidates = HW_ENCODER_CANDIDATES if name == "auto" else (name,)
+    _hw_encoder = next((c for c in candidates if _is_encoder_available(c)), None)
+    if _hw_encoder is None:
+        logger.info("H.264ハードウェアエンコーダーが見つかりません（libx264を使用）")
+        return None
+
+    h264.create_encoder_context = _create_encoder_context
+    logger.info(f"H.264ハードウェアエンコーダーを使用: {_hw_encoder}")
+    return _hw_encoder
+
+
+def is_hw_h264_enabled() -> bool:
+    """ハードウェアエンコーダーが有効か"""
+    return _hw_encoder is not None
+
+
+def prefer_h264(transceiver) -> None:
+    """
+    transceiverのコーデック優先順位をH.264先頭にする
+    （ブラウザのOfferはVP8が先頭のため、指定しないとハードウェアエンコーダーが使われない）
+    setRemoteDescriptionより前に呼ぶこと
+    """
+    codecs = RTCRtpSender.getCapabilities("video").codecs
+    transceiver.setCodecPreferences(
+        sorted(codecs, key=lambda c: c.mimeType.lower() != "video/h264")
+    )
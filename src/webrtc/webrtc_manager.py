@@ -4,20 +4,49 @@ aiortcを使ったWebRTC接続管理を提供
 """
 import asyncio
 import logging
-from typing import Set
+import time
+from typing import Dict, Optional
 from aiortc import RTCPeerConnection, RTCSessionDescription, VideoStreamTrack
+from aiortc.contrib.media import MediaRelay
 from av import VideoFrame
 import numpy as np
 
+from src.config.settings import WEBRTC_H264_ENCODER, WEBRTC_MAX_PEERS
+from src.webrtc.hw_encoder import install_hw_h264_encoder, is_hw_h264_enabled, prefer_h264
+
 logger = logging.getLogger(__name__)
 
 
 class VideoTrack(VideoStreamTrack):
     """カメラフレームをWebRTCで配信するためのVideoTrack"""
     
+    # 送信用フレームの面数（エンコーダーが前のフレームを参照中でも上書きしないよう3面）
+    FRAME_POOL_SIZE = 3
+    
     def __init__(self, camera_manager):
         super().__init__()
         self.camera_manager = camera_manager
+        self._frame_count = 0
+        self._allocate_frames(640, 480)
+    
+    def _allocate_frames(self, width: int, height: int):
+        """送信用VideoFrameを確保（解像度が変わった場合のみ再確保）"""
+        self._shape = (height, width, 3)
+        self._av_frames = [VideoFrame(width, height, "bgr24") for _ in range(self.FRAME_POOL_SIZE)]
+        # 各フレームのPlaneを指すndarrayビュー（毎フレームのfrombuffer/reshapeを省く）
+        self._plane_views = [self._plane_view(f) for f in self._av_frames]
+        # ダミーフレーム（黒画面）はエンコーダー入力形式 (yuv420p) で1回だけ生成し、ptsのみ更新して再利用
+        self._black_frame = VideoFrame.from_ndarray(
+            np.zeros((height, width, 3), dtype=np.uint8), format="bgr24"
+        ).reformat(format="yuv420p")
+    
+    @staticmethod
+    def _plane_view(video_frame: VideoFrame) -> np.ndarray:
+        """bgr24フレームのPlaneを (height, width, 3) のndarrayとして参照（行末パディングは除く）"""
+        plane = video_frame.planes[0]
+        width = video_frame.width
+        rows = np.frombuffer(plane, dtype=np.uint8).reshape(video_frame.height, plane.line_size)
+        return rows[:, :width * 3].reshape(video_frame.height, width, 3)
     
     async def recv(self):
         """フレームを取得してWebRTCに送信"""
@@ -25,14 +54,16 @@ class VideoTrack(VideoStreamTrack):
         
         frame = self.camera_manager.get_frame()
         if frame is None:
-            # ダミーフレーム（黒画面）を返す
-            img = np.zeros((480, 640, 3), dtype=np.uint8)
+            video_frame = self._black_frame
         else:
-            img = frame
+            if frame.shape != self._shape:
+                self._allocate_frames(frame.shape[1], frame.shape[0])
+            # 確保済みフレームのPlaneへ直接書き込み（毎フレームのAVFrame確保を避ける）
+            slot = self._frame_count % self.FRAME_POOL_SIZE
+            video_frame = self._av_frames[slot]
+            self._plane_views[slot][:] = frame
+            self._frame_count += 1
         
-        # OpenCV (BGR) -> VideoFrame (RGB)
-        img_rgb = img[:, :, ::-1]
-        video_frame = VideoFrame.from_ndarray(img_rgb, format="rgb24")
         video_frame.pts = pts
         video_frame.time_base = time_base
         
@@ -44,7 +75,19 @@ class WebRTCManager:
     
     def __init__(self, camera_manager):
         self.camera_manager = camera_manager
-        self.peer_connections: Set[RTCPeerConnection] = set()
+        install_hw_h264_encoder(WEBRTC_H264_ENCODER)
+        # PeerConnection -> 接続開始時刻（挿入順 = 接続順、上限超過時は先頭から閉じる）
+        self.peer_connections: Dict[RTCPeerConnection, float] = {}
+        # 全接続で1つのVideoTrackを共有（recvとフレーム変換は接続数によらず1フレーム1回）
+        self._source_track: Optional[VideoTrack] = None
+        self._relay = MediaRelay()
+    
+    def _subscribe_video_track(self):
+        """共有VideoTrackの購読用プロキシを取得"""
+        if self._source_track is None or self._source_track.readyState == "ended":
+            self._source_track = VideoTrack(self.camera_manager)
+        # buffered=False: 遅い接続には古いフレームを溜めず最新のみ渡す
+        return self._relay.subscribe(self._source_track, buffered=False)
     
     async def create_offer(self, sdp: str, type: str) -> dict:
         """
@@ -59,26 +102,43 @@ class WebRTCManager:
         """
         offer = RTCSessionDescription(sdp=sdp, type=type)
         
+        # 接続数が上限に達している場合は最も古い接続を閉じる
+        while self.peer_connections and len(self.peer_connections) >= WEBRTC_MAX_PEERS:
+            oldest = next(iter(self.peer_connections))
+            logger.warning(f"WebRTC接続数が上限（{WEBRTC_MAX_PEERS}）に達したため最も古い接続を閉じます")
+            await self.close_peer_connection(oldest)
+        
         # RTCPeerConnection作成（引数なし）
         pc = RTCPeerConnection()
-        self.peer_connections.add(pc)
+        self.peer_connections[pc] = time.monotonic()
         
         @pc.on("connectionstatechange")
         async def on_connectionstatechange():
             logger.info(f"WebRTC接続状態: {pc.connectionState}")
-            if pc.connectionState in ["failed", "closed"]:
-                await self.close_peer_connection(pc)
-        
-        # VideoTrackを追加
-        video_track = VideoTrack(self.camera_manager)
-        pc.addTrack(video_track)
+            if pc.connectionState == "failed":
+                # close()で"closed"に遷移し、参照の解放はそのイベントで1回だけ行う
+                await pc.close()
+            elif pc.connectionState == "closed":
+                self.peer_connections.pop(pc, None)
         
-        # Offerを設定
-        await pc.setRemoteDescription(offer)
-        
-        # Answerを生成
-        answer = await pc.createAnswer()
-        await pc.setLocalDescription(answer)
+        try:
+            # 共有VideoTrackを追加
+            sender = pc.addTrack(self._subscribe_video_track())
+            if is_hw_h264_enabled():
+                # ハードウェアエンコーダーを使うためH.264を優先（Offer設定前に指定）
+                transceiver = next(t for t in pc.getTransceivers() if t.sender is sender)
+                prefer_h264(transceiver)
+            
+            # Offerを設定
+            await pc.setRemoteDescription(offer)
+            
+            # Answerを生成
+            answer = await pc.createAnswer()
+            await pc.setLocalDescription(answer)
+        except Exception:
+            # ネゴシエーション失敗時も接続を閉じて参照を残さない
+            await self.close_peer_connection(pc)
+            raise
         
         logger.info("WebRTC Answerを生成しました")
         
@@ -89,16 +149,21 @@ class WebRTCManager:
     
     async def close_peer_connection(self, pc: RTCPeerConnection):
         """特定のPeerConnectionを閉じる"""
+        # 閉じる処理が失敗しても参照は残さない
+        self.peer_connections.pop(pc, None)
         try:
             await pc.close()
-            self.peer_connections.discard(pc)
             logger.info("WebRTC接続を閉じました")
         except Exception as e:
             logger.error(f"WebRTC接続終了エラー: {e}")
     
     async def close_all(self):
         """すべてのPeerConnectionを閉じる"""
-        coros = [pc.close() for pc in self.peer_connections]
+        # close()中の状態変化イベントで集合が変更されるため、スナップショットに対して実行
+        coros = [pc.close() for pc in list(self.peer_connections)]
         await asyncio.gather(*coros, return_exceptions=True)
         self.peer_connections.clear()
+        if self._source_track:
+            self._source_track.stop()
+            self._source_track = None
         logger.info("すべてのWebRTC接続を閉じました")
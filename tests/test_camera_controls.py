@@ -0,0 +1,58 @@
+"""
+v4l2-ctl -L 出力の解析テスト
+実機のカメラ・v4l2-ctlは使わず、出力例を直接解析する
+"""
+import pytest
+
+pytest.importorskip("cv2")
+
+from src.camera.camera_manager import _parse_v4l2_controls
+
+# UVCのPTZカメラの出力例（pan_relative/tilt_relativeは書き込み専用でvalue=がない）
+V4L2_CTL_OUTPUT = """
+User Controls
+
+                     brightness 0x00980900 (int)    : min=-64 max=64 step=1 default=0 value=5
+        white_balance_automatic 0x0098090c (bool)   : default=1 value=1
+           power_line_frequency 0x00980918 (menu)   : min=0 max=2 default=1 value=1
+				0: Disabled
+				1: 50 Hz
+				2: 60 Hz
+      white_balance_temperature 0x0098091a (int)    : min=2800 max=6500 step=1 default=4600 value=4600 flags=inactive
+
+Camera Controls
+
+                  auto_exposure 0x009a0901 (menu)   : min=0 max=3 default=3 value=3
+				1: Manual Mode
+				3: Aperture Priority Mode
+                   pan_relative 0x009a0904 (int)    : min=-4480 max=4480 step=1 default=0 flags=write-only
+                  tilt_relative 0x009a0905 (int)    : min=-1440 max=1440 default=0 flags=write-only
+                    zoom_option 0x009a0990 (menu)   : min=0 max=1 default=0 flags=write-only
+				0: Off
+				1: On
+               pan_tilt_reset 0x009a0910 (button) : flags=write-only
+"""
+
+
+def test_parse_skips_controls_without_required_values():
+    controls = _parse_v4l2_controls(V4L2_CTL_OUTPUT)
+
+    assert set(controls) == {
+        'brightness', 'white_balance_automatic', 'power_line_frequency',
+        'white_balance_temperature', 'auto_exposure', 'pan_tilt_reset',
+    }
+    # スキップしたmenuのオプション行が直前のコントロールに付かない
+    assert controls['auto_exposure']['options'] == {1: 'Manual Mode', 3: 'Aperture Priority Mode'}
+
+
+def test_parse_control_values():
+    controls = _parse_v4l2_controls(V4L2_CTL_OUTPUT)
+
+    assert controls['brightness'] == {
+        'type': 'int', 'id': '0x00980900', 'min': -64, 'max': 64, 'step': 1,
+        'default': 0, 'value': 5, 'flags': '', 'section': 'User Controls',
+    }
+    assert controls['white_balance_temperature']['flags'] == 'inactive'
+    assert controls['power_line_frequency']['options'] == {0: 'Disabled', 1: '50 Hz', 2: '60 Hz'}
+    assert controls['white_balance_automatic']['value'] == 1
+    assert controls['pan_tilt_reset']['section'] == 'Camera Controls'
@@ -0,0 +1,98 @@
+"""
+CONControllerのポジションテーブル読み出しのテスト
+シリアル通信は行わず、read_registersを模擬したインストゥルメントで検証する
+"""
+import types
+
+import pytest
+
+pytest.importorskip("minimalmodbus")
+
+from src.gripper.controller import CONController, _long_to_registers
+
+
+def _make_row(position):
+    """ポジション番号から判別できる値を持つ1行分 (+0〜+15) のレジスタ値を作成"""
+    row = [0] * CONController.POS_ROW_STRIDE
+    row[0:2] = _long_to_registers(-100 * position - 1, signed=True)  # 目標位置
+    row[2:4] = _long_to_registers(10)                                 # 位置決め幅
+    row[4:6] = _long_to_registers(1000 + position)                    # 速度
+    row[10] = 30   # 加速度
+    row[11] = 40   # 減速度
+    row[12] = 255  # 押付け電流
+    row[14] = position
+    return row
+
+
+class FakeInstrument:
+    """ポジションテーブル64行分を保持するminimalmodbus.Instrumentの代わり"""
+
+    def __init__(self, fail_on_call=None):
+        self.serial = types.SimpleNamespace(timeout=0.1)
+        self.table = [reg for n in range(64) for reg in _make_row(n)]
+        self.calls = []
+        self.timeouts = []
+        self.fail_on_call = fail_on_call
+
+    def read_registers(self, address, count, functioncode=3):
+        self.calls.append((address, count))
+        self.timeouts.append(self.serial.timeout)
+        if self.fail_on_call == len(self.calls):
+            raise IOError("No communication with the instrument (no answer)")
+        offset = address - CONController.POS_TABLE_START
+        return self.table[offset:offset + count]
+
+
+def _make_controller(instrument):
+    """シリアルポートを開かずにCONControllerを作成"""
+    controller = CONController.__new__(CONController)
+    controller.instrument = instrument
+    controller.baudrate = 38400
+    controller.read_timeout = 0.1
+    return controller
+
+
+def test_position_row_to_dict():
+    row = _make_row(3)[:CONController.POS_ROW_WRITE_COUNT]
+    assert CONController._position_row_to_dict(row) == {
+        'position_mm': -3.01,
+        'width_mm': 0.1,
+        'speed_mm_s': 10.03,
+        'accel_g': 0.3,
+        'decel_g': 0.4,
+        'push_current_percent': 100,
+        'control_flag_hex': '0003',
+    }
+
+
+def test_get_position_table_reads_seven_rows_per_request():
+    instrument = FakeInstrument()
+    rows = _make_controller(instrument).get_position_table()
+
+    assert [row['position'] for row in rows] == list(range(64))
+    assert rows[63] == {'position': 63, **CONController._position_row_to_dict(_make_row(63))}
+    # 64行を7行ずつ: 10回 (最後は1行)、1回あたりFC03の上限125レジスタ以内
+    assert len(instrument.calls) == 10
+    assert instrument.calls[0] == (CONController.POS_TABLE_START, 16 * 6 + 15)
+    assert instrument.calls[-1] == (CONController.POS_TABLE_START + 16 * 63, 15)
+    assert all(count <= 125 for _, count in instrument.calls)
+
+
+def test_get_position_table_partial_range():
+    instrument = FakeInstrument()
+    rows = _make_controller(instrument).get_position_table(start=5, count=3)
+
+    assert [row['position'] for row in rows] == [5, 6, 7]
+    assert instrument.calls == [(CONController.POS_TABLE_START + 16 * 5, 16 * 2 + 15)]
+
+
+def test_get_position_table_restores_timeout_on_error():
+    instrument = FakeInstrument(fail_on_call=2)
+    controller = _make_controller(instrument)
+
+    with pytest.raises(IOError):
+        controller.get_position_table()
+
+    # 一括読み出し中のみ長いタイムアウトを使い、失敗しても元の値に戻す
+    assert instrument.timeouts[0] > 0.1
+    assert instrument.serial.timeout == 0.1
@@ -0,0 +1,30 @@
+"""
+WebRTCモジュールのインポートテスト
+インストール済みのaiortcでモジュールが読み込め、エンコーダー差し替えの可否と有効状態が一致することを確認する
+"""
+import pytest
+
+pytest.importorskip("aiortc")
+pytest.importorskip("numpy")
+
+from src.webrtc import hw_encoder
+
+
+def test_webrtc_manager_imports():
+    from src.webrtc.webrtc_manager import WebRTCManager, VideoTrack  # noqa: F401
+
+
+def test_install_is_noop_without_encoder_hook(monkeypatch):
+    monkeypatch.setattr(hw_encoder, "_original_create_encoder_context", None)
+
+    assert hw_encoder.install_hw_h264_encoder("auto") is None
+    assert not hw_encoder.is_hw_h264_enabled()
+
+
+def test_install_matches_installed_aiortc():
+    name = hw_encoder.install_hw_h264_encoder("auto")
+
+    if not hw_encoder._supports_encoder_hook():
+        assert name is None
+    assert hw_encoder.is_hw_h264_enabled() == (name is not None)
+    hw_encoder.install_hw_h264_encoder("none")
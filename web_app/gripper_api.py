@@ -0,0 +1,103 @@
+"""
+グリッパーAPIルーター
+app.py と web_app/main_webrtc_fixed.py で共通のグリッパーエンドポイントを提供
+（Modbus通信はGripperManager経由で排他制御・非同期実行）
+"""
+import logging
+from typing import Callable, Optional
+
+from fastapi import APIRouter, HTTPException
+
+from src.gripper.gripper_manager import GripperManager
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/gripper")
+
+# 各アプリのGripperManagerを参照する関数（起動後に差し替えられるためインスタンスではなく関数で保持）
+_manager_provider: Callable[[], Optional[GripperManager]] = lambda: None
+
+
+def set_manager_provider(provider: Callable[[], Optional[GripperManager]]) -> None:
+    """ルーターが使用するGripperManagerの取得関数を登録"""
+    global _manager_provider
+    _manager_provider = provider
+
+
+def _require_manager() -> GripperManager:
+    """接続済みのGripperManagerを取得（未接続時は503）"""
+    manager = _manager_provider()
+    if not manager or not manager.is_connected:
+        raise HTTPException(status_code=503, detail="グリッパーが接続されていません")
+    return manager
+
+
+@router.get("/status")
+async def gripper_status():
+    """グリッパーステータス取得"""
+    manager = _require_manager()
+
+    try:
+        return await manager.get_status()
+    except Exception as e:
+        logger.error(f"グリッパーステータス取得エラー: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@router.post("/servo/{action}")
+async def gripper_servo(action: str):
+    """サーボON/OFF"""
+    manager = _require_manager()
+
+    if action not in ("on", "off"):
+        raise HTTPException(status_code=400, detail="actionは'on'または'off'を指定してください")
+
+    try:
+        if action == "on":
+            await manager.servo_on()
+        else:
+            await manager.servo_off()
+        return {"status": "ok", "action": action}
+    except Exception as e:
+        logger.error(f"サーボ制御エラー: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/home")
+async def gripper_home():
+    """原点復帰"""
+    manager = _require_manager()
+
+    try:
+        await manager.home()
+        return {"status": "ok", "message": "原点復帰を開始しました"}
+    except Exception as e:
+        logger.error(f"原点復帰エラー: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/move/{position}")
+async def gripper_move(position: int):
+    """ポジション移動"""
+    manager = _require_manager()
+
+    try:
+        await manager.move_to_position(position)
+        return {"status": "ok", "position": position}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"ポジション移動エラー: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/position_table")
+async def gripper_position_table_all():
+    """ポジションテーブル全件取得（数行ずつまとめて読み出し）"""
+    manager = _require_manager()
+
+    try:
+        return {"status": "ok", "data": await manager.get_all_position_tables()}
+    except Exception as e:
+        logger.error(f"ポジションテーブル一括取得エラー: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
@@ -11,9 +11,14 @@ import os
 import sys
 import asyncio
 import json
+import logging
 import traceback
 import datetime
 import signal
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional
 
@@ -22,15 +27,21 @@ import numpy as np
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from aiortc import RTCPeerConnection, RTCSessionDescription, VideoStreamTrack
+from aiortc.contrib.media import MediaRelay
 import av
 
 # プロジェクトルートをパスに追加
 PROJECT_ROOT = Path(__file__).parent.parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
-from gripper_controller.CONController import CONController
+from src.gripper.gripper_manager import GripperManager
+from web_app.gripper_api import router as gripper_router, set_manager_provider
+from src.webrtc.hw_encoder import install_hw_h264_encoder, is_hw_h264_enabled, prefer_h264
+from src.utils.responses import DefaultJSONResponse
+from src.config.settings import DEV_MODE, WEBRTC_H264_ENCODER, WEBRTC_MAX_PEERS
+
+logger = logging.getLogger(__name__)
 
 # 環境変数
 CAMERA_DEVICE = int(os.getenv("CAMERA_DEVICE", "0"))
@@ -43,17 +54,63 @@ SNAPSHOT_DIR = PROJECT_ROOT / "snapshots"
 SNAPSHOT_DIR.mkdir(exist_ok=True)
 
 # FastAPIアプリ
-app = FastAPI(title="自動組立ロボット制御 - WebRTC版")
+app = FastAPI(title="自動組立ロボット制御 - WebRTC版", default_response_class=DefaultJSONResponse)
 
-# テンプレート
+# テンプレート (起動時に1回だけ読み込む)
 templates_dir = Path(__file__).parent / "templates"
-templates = Jinja2Templates(directory=str(templates_dir))
+INDEX_HTML_PATH = templates_dir / "index_webrtc_fixed.html"
+INDEX_HTML = INDEX_HTML_PATH.read_text(encoding="utf-8")
 
 # WebRTC関連 (shared_frame方式)
-pcs = set()
-shared_frame = {"frame": None}
+# PeerConnection -> 接続開始時刻 (挿入順 = 接続順、上限超過時は先頭から閉じる)
+pcs: dict = {}
+# 各PeerConnectionの要求解像度 (カメラは面積が最大の要求で取得し、縮小はエンコーダー側に任せる)
+pc_resolutions = {}
+# frame: MJPEG/YUYVはyuv420pのav.VideoFrame、それ以外はBGRのndarray
+#        リーダーは毎回新しいオブジェクトを公開し、公開後はrecvがpts/time_baseを設定するのみ (コピー不要)
+# consumed: 最新フレームがいずれかのトラックに取得済みか (未取得ならデコードを省く)
+# jpeg: MJPEG時はカメラが出力したJPEGの生データ (スナップショットは再エンコードせず保存)
+shared_frame = {"frame": None, "jpeg": None, "seq": 0, "consumed": True}
+# 新フレーム到着の通知 (複数トラックがseqの変化を待つ、startup_eventで生成)
+frame_condition: Optional[asyncio.Condition] = None
 camera_capture = None
+# カメラ設定の変更回数 (リーダーは開いた時点の値と異なればカメラスレッドで開き直す)
+camera_settings_generation = 0
+# カメラを開いた時点で確定した実際の設定 (status APIはキャプチャに触れずこれを返す)
+camera_info = {}
 frame_reader_task = None
+# カメラスレッドを固定するCPUコア (例: "3" / "2,3")、未指定時は4コア以上なら最終コア
+_affinity_env = os.getenv("CAMERA_CPU_AFFINITY", "")
+CAMERA_CPU_AFFINITY = {int(c) for c in _affinity_env.split(",") if c.strip()}
+if not CAMERA_CPU_AFFINITY and (os.cpu_count() or 1) >= 4:
+    CAMERA_CPU_AFFINITY = {os.cpu_count() - 1}
+
+
+def _pin_camera_thread():
+    """カメラスレッドをCPUコアに固定 (HTTP/グリッパー処理とのコア競合を避ける)"""
+    if not CAMERA_CPU_AFFINITY or not hasattr(os, "sched_setaffinity"):
+        return
+    try:
+        os.sched_setaffinity(0, CAMERA_CPU_AFFINITY)  # 0 = 呼び出し元スレッド
+        print(f"📌 カメラスレッドをCPU {sorted(CAMERA_CPU_AFFINITY)} に固定")
+    except OSError as e:
+        print(f"⚠️ CPUアフィニティ設定失敗: {e}")
+
+
+# カメラ読み取り専用スレッド (デフォルトexecutorを使うAPI処理と競合させない)
+camera_executor = ThreadPoolExecutor(
+    max_workers=1, thread_name_prefix="cam", initializer=_pin_camera_thread
+)
+# 視聴者(PeerConnection)がいる間だけセット (startup_eventでイベントループ上に生成)
+viewer_event: Optional[asyncio.Event] = None
+# 視聴者がいなくなってからカメラを解放するまでの猶予 [秒]
+CAMERA_IDLE_RELEASE_DELAY = float(os.getenv("CAMERA_IDLE_RELEASE_DELAY", "5.0"))
+# 視聴者なしでカメラを解放中か (status APIで接続失敗と区別して報告)
+camera_idle = False
+# フレームを待っているスナップショット要求の数 (待機中は視聴者がいなくてもカメラを開く)
+snapshot_waiters = 0
+# 解放中のカメラを開いてスナップショット用のフレームを待つ最大時間 [秒]
+SNAPSHOT_FRAME_TIMEOUT = 5.0
 
 camera_settings = {
     "width": 640,
@@ -71,10 +128,36 @@ class CameraVideoTrack(VideoStreamTrack):
     def __init__(self, device: int, width: int = 640, height: int = 480):
         super().__init__()
         self.device = device
-        self.width = width
-        self.height = height
         self._frame_count = 0
+        self._last_seq = 0  # 最後に送信したフレームのseq
+        self._allocate_frames(width, height)
         print(f"🎥 CameraVideoTrack初期化: {width}x{height}")
+    
+    def _allocate_frames(self, width: int, height: int):
+        """
+        送信用フレームを確保 (解像度はカメラの取得解像度に合わせ、フレーム毎のリサイズはしない)
+        解像度が変わった場合のみ呼ばれ、エンコーダーは新しい解像度で作り直される
+        """
+        self.width = width
+        self.height = height
+        self._shape = (height, width, 3)  # 受け取るBGRフレームの形状 (recvでの解像度判定用)
+        # 送信用VideoFrameを確保して順に再利用 (毎フレームのPlane/Format生成を避ける)
+        # MediaRelayで複数の送信側が同じフレームを参照するため、遅い送信側の分も含め3枚
+        self._av_frames = [av.VideoFrame(width, height, "bgr24") for _ in range(3)]
+        # 各フレームのPlaneを指すndarrayビューも確保時に作っておく (毎フレームのfrombuffer/reshapeを省く)
+        self._plane_views = [self._plane_view(f) for f in self._av_frames]
+        # 黒画面フォールバックはエンコーダー入力形式 (yuv420p) で1回だけ生成し、ptsのみ更新して再利用
+        self._black_frame = av.VideoFrame.from_ndarray(
+            np.zeros((height, width, 3), dtype=np.uint8), format="bgr24"
+        ).reformat(format="yuv420p")
+    
+    @staticmethod
+    def _plane_view(video_frame: av.VideoFrame) -> np.ndarray:
+        """bgr24フレームのPlaneを (height, width, 3) のndarrayとして参照 (行末パディングは除く)"""
+        plane = video_frame.planes[0]
+        width = video_frame.width
+        rows = np.frombuffer(plane, dtype=np.uint8).reshape(video_frame.height, plane.line_size)
+        return rows[:, :width * 3].reshape(video_frame.height, width, 3)
         
     async def recv(self):
         """フレーム取得 (shared_frameから)"""
@@ -86,35 +169,55 @@ class CameraVideoTrack(VideoStreamTrack):
         
         pts, time_base = await self.next_timestamp()
         
+        # 新しいフレームが届くまで待機 (最大1秒)
+        try:
+            async with frame_condition:
+                await asyncio.wait_for(
+                    frame_condition.wait_for(lambda: shared_frame["seq"] != self._last_seq),
+                    timeout=1.0
+                )
+        except asyncio.TimeoutError:
+            pass
+        
         # shared_frameから取得
         frame = shared_frame.get("frame")
+        self._last_seq = shared_frame["seq"]
+        shared_frame["consumed"] = True
         
-        # フレームが取得できるまで待機
-        retry_count = 0
-        while frame is None and retry_count < 100:
-            await asyncio.sleep(0.01)
-            frame = shared_frame.get("frame")
-            retry_count += 1
+        if isinstance(frame, av.VideoFrame):
+            # MJPEG・YUYVはカメラスレッドでyuv420pに変換済み (ptsの設定のみ)
+            # 読み取るトラックはMediaRelayの元の1つだけのため、公開されたフレームをそのまま送る
+            frame.pts = pts
+            frame.time_base = time_base
+            self._frame_count += 1
+            
+            if self._frame_count % 30 == 0:
+                print(f"📹 フレーム送信 (YUV): {frame.width}x{frame.height}, pts={pts}")
+            
+            return frame
         
         if frame is None or not isinstance(frame, np.ndarray):
-            # フォールバック: 黒画面
-            frame = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+            # フォールバック: 黒画面 (確保・変換なし)
             if self._frame_count % 30 == 0:
                 print(f"⚫ フレーム未取得: 黒画面を送信 (count={self._frame_count})")
+            self._black_frame.pts = pts
+            self._black_frame.time_base = time_base
+            self._frame_count += 1
+            return self._black_frame
         else:
-            # コピーして使用
-            frame = frame.copy()
-            
-            # リサイズが必要な場合
-            if frame.shape[0] != self.height or frame.shape[1] != self.width:
-                frame = cv2.resize(frame, (self.width, self.height))
+            # カメラの解像度が変わった場合は送信用フレームを取り直す (リサイズはしない)
+            if frame.shape != self._shape:
+                print(f"📐 送信解像度を変更: {frame.shape[1]}x{frame.shape[0]}")
+                self._allocate_frames(frame.shape[1], frame.shape[0])
             
             if self._frame_count % 30 == 0:
                 print(f"📹 フレーム送信: {frame.shape} (count={self._frame_count})")
         
-        # av.VideoFrameに変換
+        # av.VideoFrameに変換 (確保済みフレームのPlaneへ直接書き込み)
         try:
-            video_frame = av.VideoFrame.from_ndarray(frame, format="bgr24")
+            slot = self._frame_count % len(self._av_frames)
+            video_frame = self._av_frames[slot]
+            self._plane_views[slot][:] = frame
             video_frame.pts = pts
             video_frame.time_base = time_base
             self._frame_count += 1
@@ -129,91 +232,240 @@ class CameraVideoTrack(VideoStreamTrack):
             raise
 
 
+# OpenCVでBGRに変換せず生データのまま受け取るフォーマット
+# MJPG: libavcodecでYUVにデコード / YUYV: yuyv422のav.VideoFrameとしてエンコーダーに渡す
+RAW_CAPTURE_FOURCCS = ("MJPG", "YUYV")
+
+
+def _open_camera_capture():
+    """
+    カメラを開いてcamera_settingsを反映 (カメラ専用スレッドで実行)
+    FOURCCは解像度より先に設定する (後から設定するとYUYVのまま解像度が確定するドライバがある)
+    """
+    camera_info.clear()
+    capture = cv2.VideoCapture(CAMERA_DEVICE, cv2.CAP_V4L2)
+    requested = camera_settings["fourcc"]
+    capture.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*requested))
+    if requested in RAW_CAPTURE_FOURCCS:
+        capture.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+    
+    capture.set(cv2.CAP_PROP_FRAME_WIDTH, camera_settings["width"])
+    capture.set(cv2.CAP_PROP_FRAME_HEIGHT, camera_settings["height"])
+    capture.set(cv2.CAP_PROP_FPS, camera_settings["fps"])
+    
+    if capture.isOpened():
+        actual = int(capture.get(cv2.CAP_PROP_FOURCC)).to_bytes(4, "little").decode("ascii", "replace")
+        if actual != requested:
+            print(f"⚠️ カメラが{requested}に非対応のため{actual}で取得します")
+            if actual not in RAW_CAPTURE_FOURCCS:
+                # 解釈できない生バッファを受け取らないようBGR変換に戻す
+                capture.set(cv2.CAP_PROP_CONVERT_RGB, 1)
+        # VideoCaptureはスレッドセーフでないため、取得中にAPIから問い合わせないよう開いた時点で記録
+        camera_info.update(
+            width=int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            height=int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            fps=capture.get(cv2.CAP_PROP_FPS),
+            fourcc=actual,
+        )
+    return capture
+
+
+def _retrieve_frame(capture, decoder):
+    """
+    grab済みフレームを取り出す (カメラ専用スレッドで実行)
+    MJPEG・YUYV生データはBGRを経由せず、エンコーダー入力形式 (yuv420p) のav.VideoFrameで返す
+    (色変換もこのスレッドで行い、recvではイベントループ上でフレーム全体を処理しない)
+    
+    Returns:
+        (フレーム, JPEG生データ)。JPEGはMJPEG時のみ、取得失敗時はフレームがNone
+    """
+    ret, buf = capture.retrieve()
+    if not ret or buf is None:
+        return None, None
+    if buf.ndim == 3 and buf.shape[2] == 3:
+        # バックエンドがBGRに変換済みの場合
+        return buf, None
+    if camera_info.get("fourcc") == "YUYV":
+        width, height = camera_info["width"], camera_info["height"]
+        frame = av.VideoFrame(width, height, "yuyv422")
+        plane = frame.planes[0]
+        dst = np.frombuffer(plane, dtype=np.uint8).reshape(height, plane.line_size)
+        dst[:, :width * 2] = buf.reshape(height, width * 2)
+        return frame.reformat(format="yuv420p"), None
+    # retrieveのバッファをそのままパケット化 (bytesへの中間コピーなし)
+    frames = decoder.decode(av.Packet(buf))
+    if not frames:
+        return None, buf
+    return frames[0].reformat(format="yuv420p"), buf
+
+
+def _request_camera_reopen():
+    """カメラ設定の変更をリーダーへ通知 (解放・再オープンはリーダーがカメラスレッドで行う)"""
+    global camera_settings_generation
+    camera_settings_generation += 1
+
+
+async def _release_camera_capture():
+    """
+    キャプチャをカメラスレッドで解放 (VideoCaptureはスレッドセーフでないため)
+    camera_executorは1スレッドのため、実行中のgrab/retrieveが終わってから解放される
+    """
+    global camera_capture
+    capture, camera_capture = camera_capture, None
+    if capture is not None:
+        await asyncio.get_running_loop().run_in_executor(camera_executor, capture.release)
+
+
+def _read_frame(capture, decoder):
+    """
+    次のフレームをgrabし、前のフレームが取得済みの場合のみretrieveでデコード (カメラ専用スレッドで実行)
+    grabはV4L2のDQBUFでセンサーのフレーム周期に合わせてブロックするため、タイマーでの待機は不要
+    
+    Returns:
+        (成否, フレーム, JPEG生データ)。未取得のため読み捨てた場合は (True, None, None)
+    """
+    if not capture.grab():
+        return False, None, None
+    if not shared_frame["consumed"]:
+        return True, None, None
+    frame, jpeg = _retrieve_frame(capture, decoder)
+    return frame is not None, frame, jpeg
+
+
 async def camera_frame_reader():
     """バックグラウンドでカメラフレームを読み取り (camera_controller方式)"""
-    global camera_capture
+    global camera_capture, camera_idle
     
     loop = asyncio.get_event_loop()
     frame_count = 0
+    mjpeg_decoder = av.CodecContext.create("mjpeg", "r")
+    opened_generation = camera_settings_generation
     
     print(f"📷 カメラフレームリーダー起動: /dev/video{CAMERA_DEVICE}")
     
     while True:
         try:
+            # 視聴者がいない間は読み取りを止め、猶予経過後はカメラを解放して待機
+            if not viewer_event.is_set():
+                try:
+                    await asyncio.wait_for(viewer_event.wait(), timeout=CAMERA_IDLE_RELEASE_DELAY)
+                except asyncio.TimeoutError:
+                    if camera_capture:
+                        print("💤 視聴者なし: カメラを解放します")
+                        await _release_camera_capture()
+                        shared_frame["frame"] = None
+                        shared_frame["jpeg"] = None
+                        shared_frame["consumed"] = True
+                    camera_idle = True
+                    await viewer_event.wait()
+                    camera_idle = False
+                    print("👀 視聴者接続: カメラ読み取りを再開します")
+                continue
+            
+            # 解像度・コーデックが変更された場合はカメラスレッドで解放してから開き直す
+            if camera_capture is not None and opened_generation != camera_settings_generation:
+                print("🔄 カメラ設定変更: カメラを開き直します")
+                await _release_camera_capture()
+            
             if camera_capture is None or not camera_capture.isOpened():
                 print(f"📷 カメラ接続中: /dev/video{CAMERA_DEVICE}")
-                camera_capture = cv2.VideoCapture(CAMERA_DEVICE)
-                
-                # カメラ設定を反映
-                camera_capture.set(cv2.CAP_PROP_FRAME_WIDTH, camera_settings["width"])
-                camera_capture.set(cv2.CAP_PROP_FRAME_HEIGHT, camera_settings["height"])
-                camera_capture.set(cv2.CAP_PROP_FPS, camera_settings["fps"])
-                
-                # フォーマット設定 (MJPEG)
-                fourcc = cv2.VideoWriter_fourcc(*camera_settings["fourcc"])
-                camera_capture.set(cv2.CAP_PROP_FOURCC, fourcc)
+                opened_generation = camera_settings_generation
+                camera_capture = await loop.run_in_executor(camera_executor, _open_camera_capture)
+                mjpeg_decoder = av.CodecContext.create("mjpeg", "r")
                 
                 if camera_capture.isOpened():
-                    actual_w = int(camera_capture.get(cv2.CAP_PROP_FRAME_WIDTH))
-                    actual_h = int(camera_capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                    actual_fps = camera_capture.get(cv2.CAP_PROP_FPS)
-                    print(f"✅ カメラ接続成功: {actual_w}x{actual_h} @ {actual_fps}fps")
+                    print(f"✅ カメラ接続成功: {camera_info['width']}x{camera_info['height']} @ {camera_info['fps']}fps")
                 else:
                     print("❌ カメラ接続失敗")
                     await asyncio.sleep(1)
                     continue
             
-            # フレーム読み取り (非同期実行)
+            # フレーム読み取り (grab〜デコードをカメラスレッドで1回の呼び出しにまとめる)
             try:
-                ret, frame = await loop.run_in_executor(None, camera_capture.read)
+                ret, frame, jpeg = await loop.run_in_executor(
+                    camera_executor, _read_frame, camera_capture, mjpeg_decoder
+                )
+                if ret and frame is None:
+                    continue  # 前のフレームが未取得のため読み捨て
             except Exception as e:
                 print(f"⚠️ フレーム読み取りエラー: {e}")
                 ret = False
                 frame = None
             
             if ret and frame is not None:
-                # shared_frameに保存
+                # shared_frameに保存して待機中のトラックへ通知
                 shared_frame["frame"] = frame
+                shared_frame["jpeg"] = jpeg
+                shared_frame["seq"] += 1
+                shared_frame["consumed"] = False
+                async with frame_condition:
+                    frame_condition.notify_all()
                 frame_count += 1
                 
                 if frame_count % 100 == 0:
-                    print(f"📸 カメラフレーム取得: {frame.shape} (count={frame_count})")
+                    size = (frame.width, frame.height) if isinstance(frame, av.VideoFrame) else frame.shape
+                    print(f"📸 カメラフレーム取得: {size} (count={frame_count})")
             else:
                 print("⚠️ カメラフレーム取得失敗: カメラを再接続します")
-                if camera_capture:
-                    camera_capture.release()
-                camera_capture = None
+                await _release_camera_capture()
                 await asyncio.sleep(1)
                 continue
             
-            # 次のフレームまで待機
-            await asyncio.sleep(0)  # イベントループに制御を戻す
-            
         except asyncio.CancelledError:
             print("📷 カメラフレームリーダー停止")
             break
         except Exception as e:
             print(f"❌ カメラエラー: {e}")
             traceback.print_exc()
-            if camera_capture:
-                camera_capture.release()
-            camera_capture = None
+            await _release_camera_capture()
             await asyncio.sleep(1)
 
 
-# グリッパーコントローラー初期化
-gripper: Optional[CONController] = None
+# グリッパー管理 (startup_eventで接続、asyncio.Lockをイベントループ上で生成するため)
+gripper_manager: Optional[GripperManager] = None
+gripper_init_task: Optional[asyncio.Task] = None
 
-try:
-    gripper = CONController(
-        port=GRIPPER_PORT,
-        slave_address=GRIPPER_SLAVE_ADDR,
-        baudrate=GRIPPER_BAUDRATE
-    )
-except Exception as e:
-    print(f"⚠️  グリッパー接続失敗: {e}")
+# グリッパーAPI (status/servo/home/move は app.py と共通のルーター)
+set_manager_provider(lambda: gripper_manager)
+app.include_router(gripper_router)
 
 
+def _report_opencv_build():
+    """OpenCVのSIMD最適化とJPEGライブラリを起動時に確認 (遅いビルドなら警告)"""
+    info = cv2.getBuildInformation()
+    lines = {}
+    for line in info.splitlines():
+        key, sep, value = line.strip().partition(":")
+        if sep and key in ("Baseline", "Dispatched code", "JPEG"):
+            lines.setdefault(key, value.strip())
+    simd = f"{lines.get('Baseline', '')} {lines.get('Dispatched code', '')}"
+    print(f"🧮 OpenCV {cv2.__version__}: SIMD=[{simd.strip()}] JPEG=[{lines.get('JPEG', '?')}]")
+    
+    if cv2.checkHardwareSupport(cv2.CPU_AVX2) and "AVX2" not in simd:
+        print("⚠️ CPUはAVX2対応ですがOpenCVがAVX2無効でビルドされています (resize/色変換が低速)")
+    if cv2.checkHardwareSupport(cv2.CPU_NEON) and "NEON" not in simd:
+        print("⚠️ CPUはNEON対応ですがOpenCVがNEON無効でビルドされています (resize/色変換が低速)")
+    if "turbo" not in lines.get("JPEG", "").lower():
+        print("⚠️ OpenCVのJPEGがlibjpeg-turboではありません (MJPEGはlibavcodecでデコードします)")
+
+
+async def _init_gripper_with_retry():
+    """グリッパー接続をバックグラウンドで試行（失敗時は1秒→最大10秒で再試行）"""
+    global gripper_manager
+    delay = 1.0
+    while True:
+        manager = GripperManager(
+            port=GRIPPER_PORT,
+            slave_address=GRIPPER_SLAVE_ADDR,
+            baudrate=GRIPPER_BAUDRATE
+        )
+        if await manager.connect():
+            gripper_manager = manager
+            print(f"🤖 グリッパー接続完了: {GRIPPER_PORT}")
+            return
+        print(f"⚠️  グリッパー接続失敗 ({delay:.0f}秒後に再試行)")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 10.0)
 
 
 # シグナルハンドラーでカメラリセット
@@ -256,10 +508,19 @@ signal.signal(signal.SIGINT, signal_handler)
 @app.on_event("startup")
 async def startup_event():
     """起動時処理"""
-    global frame_reader_task
+    global frame_reader_task, gripper_init_task, viewer_event, frame_condition
     
-    # カメラフレームリーダー起動
+    # カメラフレームリーダー起動 (視聴者が接続するまで待機)
+    viewer_event = asyncio.Event()
+    frame_condition = asyncio.Condition()
     frame_reader_task = asyncio.create_task(camera_frame_reader())
+    _report_opencv_build()
+    
+    encoder = install_hw_h264_encoder(WEBRTC_H264_ENCODER)
+    print(f"🎞️ H.264エンコーダー: {encoder or 'libx264 (CPU)'}")
+    
+    # グリッパー接続 (起動を待たせない、接続完了までAPIは503)
+    gripper_init_task = asyncio.create_task(_init_gripper_with_retry())
     
     print("🚀 Web UI起動完了 (WebRTC対応 - camera_controller方式)")
     print(f"   カメラ: /dev/video{CAMERA_DEVICE}")
@@ -270,7 +531,7 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     """終了時処理"""
-    global frame_reader_task, camera_capture
+    global frame_reader_task
     
     print("\n🛑 シャットダウン処理開始...")    
     # フレームリーダー停止
@@ -281,52 +542,115 @@ async def shutdown_event():
         except asyncio.CancelledError:
             pass
     
-    # カメラクローズ
+    # カメラクローズ (リーダーが実行中だったgrabの完了後にカメラスレッドで解放)
     if camera_capture:
         try:
-            camera_capture.release()
+            await _release_camera_capture()
             print("📷 カメラを解放しました")
         except:
             pass
+    camera_executor.shutdown(wait=False)
+    _close_control_fd()
     
     # WebRTC接続をクローズ
-    coros = [pc.close() for pc in pcs]
-    await asyncio.gather(*coros)
+    # close()中の状態変化イベントでpcsが変更されるため、スナップショットに対して実行
+    coros = [pc.close() for pc in list(pcs)]
+    await asyncio.gather(*coros, return_exceptions=True)
     pcs.clear()
+    pc_resolutions.clear()
     
     # グリッパークローズ
-    if gripper:
+    if gripper_init_task and not gripper_init_task.done():
+        gripper_init_task.cancel()
+        try:
+            await gripper_init_task
+        except asyncio.CancelledError:
+            pass
+    if gripper_manager:
         try:
-            gripper.close()
+            await gripper_manager.disconnect()
         except:
             pass
 
 
 @app.get("/", response_class=HTMLResponse)
 async def index(request: Request):
-    """メインページ"""
-    return templates.TemplateResponse("index_webrtc_fixed.html", {"request": request})
+    """メインページ (DEVモード時のみ毎回再読み込み)"""
+    if DEV_MODE:
+        return HTMLResponse(content=INDEX_HTML_PATH.read_text(encoding="utf-8"))
+    return HTMLResponse(content=INDEX_HTML)
 
 
 # ============ WebRTC Signaling ============
 
+# 全PeerConnectionで共有するカメラトラック (recvはMediaRelay経由で1フレーム1回だけ実行)
+shared_track: Optional[CameraVideoTrack] = None
+track_relay = MediaRelay()
+
+
+def _subscribe_camera_track(width: int, height: int):
+    """共有カメラトラックの購読用プロキシを取得 (トラックはカメラの解像度に追従するため作り直さない)"""
+    global shared_track
+    if shared_track is None or shared_track.readyState == "ended":
+        shared_track = CameraVideoTrack(device=CAMERA_DEVICE, width=width, height=height)
+    # buffered=False: 遅い接続には古いフレームを溜めず最新のみ渡す
+    return track_relay.subscribe(shared_track, buffered=False)
+
+
+def _update_capture_resolution():
+    """
+    接続中の要求のうち面積が最大の解像度でカメラから取得する (リーダーが再オープン)
+    幅・高さを別々に最大にすると誰も要求していない (センサー非対応の) 解像度になり得るため、1つの要求をそのまま使う
+    """
+    if not pc_resolutions:
+        return  # 視聴者がいない間は変更しない (カメラは猶予経過後に解放される)
+    capture_w, capture_h = max(pc_resolutions.values(), key=lambda size: size[0] * size[1])
+    if (capture_w, capture_h) != (camera_settings["width"], camera_settings["height"]):
+        camera_settings["width"] = capture_w
+        camera_settings["height"] = capture_h
+        _request_camera_reopen()
+        print(f"📷 カメラ解像度を要求に合わせて変更: {capture_w}x{capture_h}")
+
+
+def _release_peer(pc: RTCPeerConnection):
+    """終了したPeerConnectionへの参照を外す (トラック・エンコーダーを解放させる)"""
+    pcs.pop(pc, None)
+    if pc_resolutions.pop(pc, None) is not None:
+        # 最大解像度を要求していた接続が抜けた場合は残りの要求に合わせて下げる
+        _update_capture_resolution()
+    if not pcs and not snapshot_waiters:
+        viewer_event.clear()
+
+
 @app.post("/api/webrtc/offer")
 async def webrtc_offer(request: Request):
     """WebRTC Offer処理 (camera_controller方式)"""
+    pc = None
     try:
         params = await request.json()
         offer = RTCSessionDescription(sdp=params["sdp"], type=params["type"])
         
+        # 接続数が上限に達している場合は最も古い接続を閉じる (接続毎のエンコーダー・SRTPを解放)
+        while pcs and len(pcs) >= WEBRTC_MAX_PEERS:
+            oldest, opened_at = next(iter(pcs.items()))
+            logger.warning(f"WebRTC接続数が上限 ({WEBRTC_MAX_PEERS}) に達したため最も古い接続を閉じます "
+                           f"(接続時間 {time.monotonic() - opened_at:.0f}秒)")
+            _release_peer(oldest)
+            await oldest.close()
+        
         pc = RTCPeerConnection()
-        pcs.add(pc)
+        pcs[pc] = time.monotonic()
+        viewer_event.set()
         print(f"🔗 WebRTC接続数: {len(pcs)}")
         
         @pc.on("connectionstatechange")
         async def on_connectionstatechange():
             print(f"📡 WebRTC状態変化: {pc.connectionState}")
-            if pc.connectionState in ["failed", "closed"]:
+            if pc.connectionState == "failed":
+                # close()で"closed"に遷移し、参照の解放はそのイベントで1回だけ行う
                 await pc.close()
-                pcs.discard(pc)
+            elif pc.connectionState == "closed":
+                _release_peer(pc)
         
         @pc.on("iceconnectionstatechange")
         async def on_iceconnectionstatechange():
@@ -336,6 +660,11 @@ async def webrtc_offer(request: Request):
         def on_track(track):
             print(f"🎵 Track追加: kind={track.kind}, id={track.id}")
         
+        # ハードウェアエンコーダー使用時はH.264を優先
+        # (setRemoteDescriptionは未割り当てのtransceiverを再利用するため、先に作成して指定)
+        if is_hw_h264_enabled():
+            prefer_h264(pc.addTransceiver("video", direction="sendonly"))
+        
         # リモートDescriptionを設定
         await pc.setRemoteDescription(offer)
         print(f"📥 Offer受信: {len(offer.sdp)} bytes")
@@ -345,6 +674,10 @@ async def webrtc_offer(request: Request):
         height = params.get("height", camera_settings["height"])
         print(f"🎬 要求解像度: {width}x{height}")
         
+        # 接続中の要求の最大解像度でカメラから取得し、フレーム毎のリサイズを避ける
+        pc_resolutions[pc] = (width, height)
+        _update_capture_resolution()
+        
         # transceiverの状態をデバッグ
         transceivers = pc.getTransceivers()
         print(f"🔍 Transceiver数: {len(transceivers)}")
@@ -355,7 +688,7 @@ async def webrtc_offer(request: Request):
         video_track_set = False
         for transceiver in transceivers:
             if transceiver.kind == "video":
-                video_track = CameraVideoTrack(device=CAMERA_DEVICE, width=width, height=height)
+                video_track = _subscribe_camera_track(width, height)
                 print(f"🎥 VideoTrack作成: {video_track}, kind={video_track.kind}")
                 
                 # transceiverのdirectionをsendonlyに設定（サーバーは送信のみ）
@@ -381,6 +714,10 @@ async def webrtc_offer(request: Request):
     except Exception as e:
         error_detail = traceback.format_exc()
         print(f"❌ WebRTC Offer エラー:\n{error_detail}")
+        # ネゴシエーション失敗時も接続を閉じて参照を残さない
+        if pc is not None:
+            await pc.close()
+            _release_peer(pc)
         return JSONResponse({
             "status": "error",
             "message": str(e),
@@ -394,17 +731,24 @@ async def webrtc_offer(request: Request):
 async def camera_status():
     """カメラ状態取得"""
     try:
-        if camera_capture and camera_capture.isOpened():
-            width = int(camera_capture.get(cv2.CAP_PROP_FRAME_WIDTH))
-            height = int(camera_capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            fps = camera_capture.get(cv2.CAP_PROP_FPS)
-            
+        # 視聴者がいないため解放しているだけの場合は接続失敗 (503) とせず待機中と返す
+        if camera_idle:
+            return {
+                "status": "idle",
+                "device": CAMERA_DEVICE,
+                "message": "視聴者がいないためカメラを解放中です",
+                "current_settings": camera_settings,
+                "has_frame": False
+            }
+        # カメラスレッドが使用中のキャプチャには触れず、オープン時に記録した値を返す
+        if camera_capture is not None and camera_info:
             return {
                 "status": "ok",
                 "device": CAMERA_DEVICE,
-                "width": width,
-                "height": height,
-                "fps": fps,
+                "width": camera_info["width"],
+                "height": camera_info["height"],
+                "fps": camera_info["fps"],
+                "fourcc": camera_info["fourcc"],
                 "current_settings": camera_settings,
                 "has_frame": shared_frame.get("frame") is not None
             }
@@ -438,8 +782,6 @@ async def camera_resolutions():
 @app.post("/api/camera/resolution")
 async def set_camera_resolution(request: Request):
     """カメラ解像度変更"""
-    global camera_capture
-    
     try:
         params = await request.json()
         width = params.get("width")
@@ -451,10 +793,8 @@ async def set_camera_resolution(request: Request):
             camera_settings["height"] = height
             camera_settings["fps"] = fps
             
-            # カメラ再起動
-            if camera_capture:
-                camera_capture.release()
-                camera_capture = None
+            # カメラ再起動 (リーダーがカメラスレッドで開き直す)
+            _request_camera_reopen()
             
             return {
                 "status": "ok",
@@ -471,89 +811,129 @@ async def set_camera_resolution(request: Request):
         return JSONResponse({"status": "error", "message": str(e)}, status_code=500)
 
 
+# v4l2-ctl -L の出力パターン (起動後最初の取得時のみ使用)
+_CTRL_LINE_RE = re.compile(r'\s*(\S+)\s+(0x[0-9a-f]+)\s+\((int|menu|bool)\)\s*:(.*)$')
+_CTRL_KV_RE = re.compile(r'(min|max|step|default|value)=(-?\d+)')
+_CTRL_MENU_OPT_RE = re.compile(r'^\s+(\d+):\s+(.+)$')
+
+# VIDIOC_S_CTRL = _IOWR('V', 28, struct v4l2_control {__u32 id; __s32 value;})
+VIDIOC_S_CTRL = 0xC008561C
+# コントロール設定用に開いたままにするデバイスのfd (スライダー操作毎のopen/closeを避ける)
+_v4l2_ctrl_fd: Optional[int] = None
+_v4l2_ctrl_lock = threading.Lock()  # 同時リクエストでfdを二重に開かないよう保護
+
+# カメラ制御パラメータのキャッシュ (種類・範囲・メニューはカメラ接続中に変わらないため1回だけ解析)
+camera_control_cache: Optional[dict] = None
+camera_control_ids: dict = {}
+
+
+def _parse_v4l2_controls(output: str):
+    """v4l2-ctl -L の出力を解析 (戻り値: (controls, {名前: コントロールID}))"""
+    controls = {}
+    ids = {}
+    current_control_name = None
+    
+    for line in output.splitlines():
+        # セクションヘッダーをスキップ
+        if line.strip() in ('User Controls', 'Camera Controls', 'Codec Controls'):
+            continue
+        
+        # コントロール行: 名前・ID・型を1回のマッチで取得し、値はkey=valueをまとめて抽出
+        ctrl_match = _CTRL_LINE_RE.match(line)
+        if ctrl_match:
+            name, ctrl_id, ctrl_type, rest = ctrl_match.groups()
+            current_control_name = name
+            ids[name] = int(ctrl_id, 16)
+            ctrl = {'type': ctrl_type, 'min': 0, 'max': 1, 'step': 1}
+            ctrl.update({k: int(v) for k, v in _CTRL_KV_RE.findall(rest)})
+            if 'default' not in ctrl or 'value' not in ctrl:
+                continue
+            if ctrl_type == 'menu':
+                ctrl['options'] = {}
+            controls[name] = ctrl
+            continue
+        
+        # メニューオプション行をパース
+        menu_opt_match = _CTRL_MENU_OPT_RE.match(line)
+        if menu_opt_match and current_control_name:
+            ctrl = controls.get(current_control_name)
+            if ctrl and ctrl.get('type') == 'menu' and 'options' in ctrl:
+                idx, label = menu_opt_match.groups()
+                ctrl['options'][int(idx)] = label.strip()
+    
+    return controls, ids
+
+
+async def _run_v4l2_ctl(*args: str, timeout: float = 5.0) -> str:
+    """v4l2-ctlを非同期サブプロセスで実行して標準出力を返す (executorスレッドを使わない)"""
+    import subprocess
+    cmd = ["v4l2-ctl", f"--device=/dev/video{CAMERA_DEVICE}", *args]
+    proc = await asyncio.create_subprocess_exec(
+        *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        out, err = await asyncio.wait_for(proc.communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(
+            proc.returncode, cmd, output=out.decode(), stderr=err.decode()
+        )
+    return out.decode()
+
+
+def _close_control_fd():
+    """コントロール設定用fdを閉じる"""
+    global _v4l2_ctrl_fd
+    if _v4l2_ctrl_fd is not None:
+        os.close(_v4l2_ctrl_fd)
+        _v4l2_ctrl_fd = None
+
+
+def _set_control_ioctl(ctrl_id: int, value: int):
+    """VIDIOC_S_CTRLで直接設定 (v4l2-ctlのfork/execを省く、fdは使い回す)"""
+    import errno
+    import fcntl
+    import struct
+    global _v4l2_ctrl_fd
+    request = struct.pack("Ii", ctrl_id, value)
+    with _v4l2_ctrl_lock:
+        for retry in (False, True):
+            if _v4l2_ctrl_fd is None:
+                _v4l2_ctrl_fd = os.open(f"/dev/video{CAMERA_DEVICE}", os.O_RDWR | os.O_NONBLOCK)
+            try:
+                fcntl.ioctl(_v4l2_ctrl_fd, VIDIOC_S_CTRL, request)
+                return
+            except OSError as e:
+                # カメラの抜き差し等でfdが無効になった場合は開き直して1回だけ再試行
+                if retry or e.errno not in (errno.ENODEV, errno.ENXIO, errno.EBADF):
+                    raise
+                _close_control_fd()
+
+
 @app.get("/api/camera/controls")
 async def camera_controls():
     """カメラ制御パラメータ一覧取得 (int/bool/menu対応)"""
-    import subprocess
-    import re
+    global camera_control_cache, camera_control_ids
     try:
-        result = subprocess.run(
-            ["v4l2-ctl", f"--device=/dev/video{CAMERA_DEVICE}", "-L"],
-            capture_output=True, text=True, check=True, timeout=5
-        )
-        
-        controls = {}
-        current_control_name = None
+        if camera_control_cache is None:
+            output = await _run_v4l2_ctl("-L")
+            camera_control_cache, camera_control_ids = _parse_v4l2_controls(output)
+        elif camera_control_cache:
+            # 現在値のみを1回の --get-ctrl でまとめて再取得
+            output = await _run_v4l2_ctl(f"--get-ctrl={','.join(camera_control_cache)}")
+            for line in output.splitlines():
+                name, sep, value = line.partition(":")
+                ctrl = camera_control_cache.get(name.strip())
+                if sep and ctrl is not None:
+                    try:
+                        ctrl['value'] = int(value.strip())
+                    except ValueError:
+                        pass
         
-        for line in result.stdout.splitlines():
-            # セクションヘッダーをスキップ
-            if line.strip() in ('User Controls', 'Camera Controls', 'Codec Controls'):
-                continue
-            
-            # 整数型コントロールをパース
-            int_match = re.match(
-                r'\s*(\S+)\s+0x[0-9a-f]+\s+\(int\)\s*:\s*min=(-?\d+)\s+max=(-?\d+)\s+step=(\d+)\s+default=(-?\d+)\s+value=(-?\d+)',
-                line
-            )
-            if int_match:
-                name, min_val, max_val, step, default, value = int_match.groups()
-                current_control_name = name
-                controls[name] = {
-                    'type': 'int',
-                    'min': int(min_val),
-                    'max': int(max_val),
-                    'step': int(step),
-                    'default': int(default),
-                    'value': int(value)
-                }
-                continue
-            
-            # menu型コントロールをパース
-            menu_match = re.match(
-                r'\s*(\S+)\s+0x[0-9a-f]+\s+\(menu\)\s*:\s*min=(\d+)\s+max=(\d+)\s+default=(\d+)\s+value=(\d+)',
-                line
-            )
-            if menu_match:
-                name, min_val, max_val, default, value = menu_match.groups()
-                current_control_name = name
-                controls[name] = {
-                    'type': 'menu',
-                    'min': int(min_val),
-                    'max': int(max_val),
-                    'step': 1,
-                    'default': int(default),
-                    'value': int(value),
-                    'options': {}
-                }
-                continue
-            
-            # bool型コントロールをパース
-            bool_match = re.match(
-                r'\s*(\S+)\s+0x[0-9a-f]+\s+\(bool\)\s*:\s*default=([01])\s+value=([01])',
-                line
-            )
-            if bool_match:
-                name, default, value = bool_match.groups()
-                current_control_name = name
-                controls[name] = {
-                    'type': 'bool',
-                    'min': 0,
-                    'max': 1,
-                    'step': 1,
-                    'default': int(default),
-                    'value': int(value)
-                }
-                continue
-            
-            # メニューオプション行をパース
-            menu_opt_match = re.match(r'^\s+(\d+):\s+(.+)$', line)
-            if menu_opt_match and current_control_name:
-                ctrl = controls.get(current_control_name)
-                if ctrl and ctrl.get('type') == 'menu' and 'options' in ctrl:
-                    idx, label = menu_opt_match.groups()
-                    ctrl['options'][int(idx)] = label.strip()
-        
-        return {"status": "ok", "controls": controls}
+        return {"status": "ok", "controls": camera_control_cache}
     except Exception as e:
         return JSONResponse({"status": "error", "message": str(e)}, status_code=500)
 
@@ -563,15 +943,25 @@ async def set_camera_control(control_name: str, value: int):
     """カメラパラメータ設定"""
     import subprocess
     try:
-        subprocess.run(
-            ["v4l2-ctl", f"--device=/dev/video{CAMERA_DEVICE}", f"--set-ctrl={control_name}={value}"],
-            check=True, capture_output=True
-        )
+        ctrl_id = camera_control_ids.get(control_name)
+        if ctrl_id is not None:
+            await asyncio.to_thread(_set_control_ioctl, ctrl_id, value)
+        else:
+            # ID未取得 (一覧取得前) の場合はv4l2-ctlで設定
+            await _run_v4l2_ctl(f"--set-ctrl={control_name}={value}")
+        
+        if camera_control_cache and control_name in camera_control_cache:
+            camera_control_cache[control_name]['value'] = value
         return {"status": "ok"}
     except subprocess.CalledProcessError as e:
         return JSONResponse({
             "status": "error", 
-            "message": f"設定失敗: {e.stderr.decode()}"
+            "message": f"設定失敗: {e.stderr}"
+        }, status_code=500)
+    except OSError as e:
+        return JSONResponse({
+            "status": "error",
+            "message": f"設定失敗: {e}"
         }, status_code=500)
 
 
@@ -592,12 +982,6 @@ async def change_codec(request: Request):
     try:
         # カメラ設定を更新
         camera_settings["fourcc"] = codec
-        fourcc = cv2.VideoWriter_fourcc(*codec)
-        
-        # カメラを再初期化
-        if camera_capture:
-            camera_capture.release()
-            camera_capture = None
         
         # 既存のフレームリーダータスクをキャンセル
         if frame_reader_task and not frame_reader_task.done():
@@ -607,11 +991,12 @@ async def change_codec(request: Request):
             except asyncio.CancelledError:
                 pass
         
+        # カメラを再初期化 (リーダー停止後、カメラスレッドで解放)
+        await _release_camera_capture()
+        
         # カメラを再オープン
-        camera_capture = cv2.VideoCapture(0, cv2.CAP_V4L2)
-        camera_capture.set(cv2.CAP_PROP_FOURCC, fourcc)
-        camera_capture.set(cv2.CAP_PROP_FRAME_WIDTH, camera_settings["width"])
-        camera_capture.set(cv2.CAP_PROP_FRAME_HEIGHT, camera_settings["height"])
+        loop = asyncio.get_event_loop()
+        camera_capture = await loop.run_in_executor(camera_executor, _open_camera_capture)
         
         if not camera_capture.isOpened():
             return JSONResponse({
@@ -633,11 +1018,28 @@ async def change_codec(request: Request):
         }, status_code=500)
 
 
+def _write_snapshot(filepath: Path, frame, jpeg):
+    """スナップショットのエンコードと書き込み (別スレッドで実行する)"""
+    # MJPEGはカメラのJPEGをそのまま書き出し、デコード・再エンコードしない
+    if jpeg is not None:
+        filepath.write_bytes(jpeg.tobytes())
+        return
+    if isinstance(frame, av.VideoFrame):
+        frame = frame.to_ndarray(format="bgr24")
+    ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, 90])
+    if not ok:
+        raise RuntimeError("JPEGエンコードに失敗しました")
+    filepath.write_bytes(buf.tobytes())
+
+
 @app.post("/api/camera/snapshot")
 async def take_snapshot():
     """スナップショット撮影"""
     try:
         frame = shared_frame.get("frame")
+        if frame is None:
+            # 視聴者なしでカメラを解放中の場合は開いてフレームを待つ
+            frame = await _wait_for_camera_frame(SNAPSHOT_FRAME_TIMEOUT)
         
         if frame is None:
             return JSONResponse({
@@ -650,8 +1052,8 @@ async def take_snapshot():
         filename = f"snapshot_{timestamp}.jpg"
         filepath = SNAPSHOT_DIR / filename
         
-        # 保存
-        cv2.imwrite(str(filepath), frame)
+        # 保存 (エンコード・ディスク書き込みでイベントループをブロックしない)
+        await asyncio.to_thread(_write_snapshot, filepath, frame, shared_frame.get("jpeg"))
         
         return {
             "status": "ok",
@@ -663,20 +1065,53 @@ async def take_snapshot():
         return JSONResponse({"status": "error", "message": str(e)}, status_code=500)
 
 
+async def _wait_for_camera_frame(timeout: float):
+    """視聴者がいなくてもカメラを開かせ、フレームが届くまで待つ (タイムアウト時はNone)"""
+    global snapshot_waiters
+    snapshot_waiters += 1
+    viewer_event.set()
+    try:
+        async with frame_condition:
+            await asyncio.wait_for(
+                frame_condition.wait_for(lambda: shared_frame["frame"] is not None),
+                timeout=timeout
+            )
+        return shared_frame["frame"]
+    except asyncio.TimeoutError:
+        return None
+    finally:
+        snapshot_waiters -= 1
+        # 視聴者がいなければ再び猶予経過後に解放させる
+        if not pcs and not snapshot_waiters:
+            viewer_event.clear()
+
+
+def _scan_snapshots(limit: int = 20) -> list:
+    """スナップショット一覧を取得 (別スレッドで実行、statは表示する最新limit件のみ)"""
+    with os.scandir(SNAPSHOT_DIR) as it:
+        entries = [
+            e for e in it
+            if e.name.startswith("snapshot_") and e.name.endswith(".jpg")
+        ]
+    entries.sort(key=lambda e: e.name, reverse=True)
+    
+    snapshots = []
+    for e in entries[:limit]:
+        st = e.stat()
+        snapshots.append({
+            "filename": e.name,
+            "path": e.path,
+            "size": st.st_size,
+            "timestamp": st.st_mtime
+        })
+    return snapshots
+
+
 @app.get("/api/camera/snapshots")
 async def list_snapshots():
     """スナップショット一覧"""
     try:
-        files = sorted(SNAPSHOT_DIR.glob("snapshot_*.jpg"), reverse=True)
-        snapshots = [
-            {
-                "filename": f.name,
-                "path": str(f),
-                "size": f.stat().st_size,
-                "timestamp": f.stat().st_mtime
-            }
-            for f in files[:20]  # 最新20件
-        ]
+        snapshots = await asyncio.to_thread(_scan_snapshots, 20)  # 最新20件
         
         return {
             "status": "ok",
@@ -691,105 +1126,39 @@ async def get_snapshot(filename: str):
     """スナップショット取得"""
     filepath = SNAPSHOT_DIR / filename
     
-    if not filepath.exists() or not filepath.is_file():
+    try:
+        st = await asyncio.to_thread(os.stat, filepath)
+    except OSError:
+        st = None
+    if st is None or not stat.S_ISREG(st.st_mode):
         return JSONResponse({
             "status": "error",
             "message": "ファイルが見つかりません"
         }, status_code=404)
     
-    return FileResponse(filepath)
+    # stat結果を渡して再statを省く (pathsend対応サーバーではカーネル内転送になる)
+    # ファイル名に撮影時刻を含み内容は変わらないため、ブラウザに長期キャッシュさせる
+    return FileResponse(
+        filepath,
+        media_type="image/jpeg",
+        stat_result=st,
+        headers={"Cache-Control": "public, max-age=31536000, immutable"}
+    )
 
 
 # ============ グリッパーAPI ============
 
-@app.get("/api/gripper/status")
-async def gripper_status():
-    """グリッパー状態取得"""
-    if not gripper:
-        return JSONResponse({"status": "error", "message": "グリッパー未接続"}, status_code=503)
-    
-    try:
-        position = gripper.instrument.read_long(gripper.REG_CURRENT_POS, functioncode=3, signed=True)
-        alarm = gripper.instrument.read_register(gripper.REG_CURRENT_ALARM, functioncode=3)
-        device_status = gripper.instrument.read_register(gripper.REG_DEVICE_STATUS, functioncode=3)
-        servo_on = bool((device_status >> gripper.BIT_SERVO_READY) & 1)
-        
-        return {
-            "status": "ok",
-            "position": position,
-            "position_mm": position * 0.01,
-            "alarm": alarm,
-            "servo_on": servo_on
-        }
-    except Exception as e:
-        return JSONResponse({"status": "error", "message": str(e)}, status_code=500)
-
-
-@app.post("/api/gripper/servo/{action}")
-async def gripper_servo(action: str):
-    """グリッパーサーボON/OFF (非ブロッキング)"""
-    if not gripper:
-        return JSONResponse({"status": "error", "message": "グリッパー未接続"}, status_code=503)
-    
-    try:
-        loop = asyncio.get_event_loop()
-        if action == "on":
-            await loop.run_in_executor(None, gripper.servo_on)
-            return {"status": "ok"}
-        elif action == "off":
-            await loop.run_in_executor(None, gripper.servo_off)
-            return {"status": "ok"}
-        else:
-            return JSONResponse({"status": "error", "message": "無効なアクション"}, status_code=400)
-    except Exception as e:
-        return JSONResponse({"status": "error", "message": str(e)}, status_code=500)
-
-
-@app.post("/api/gripper/home")
-async def gripper_home():
-    """グリッパー原点復帰 (非ブロッキング)"""
-    if not gripper:
-        return JSONResponse({"status": "error", "message": "グリッパー未接続"}, status_code=503)
-    
-    try:
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, gripper.home)
-        return {"status": "ok"}
-    except Exception as e:
-        return JSONResponse({"status": "error", "message": str(e)}, status_code=500)
-
-
-@app.post("/api/gripper/move/{position}")
-async def gripper_move(position: int):
-    """グリッパー位置決め (非ブロッキング)"""
-    if not gripper:
-        return JSONResponse({"status": "error", "message": "グリッパー未接続"}, status_code=503)
-    
-    if not (0 <= position <= 63):
-        return JSONResponse({
-            "status": "error", 
-            "message": f"無効なポジション: {position}"
-        }, status_code=400)
-    
-    try:
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, gripper.move_to_pos, position)
-        return {"status": "ok"}
-    except Exception as e:
-        return JSONResponse({"status": "error", "message": str(e)}, status_code=500)
-
-
 @app.get("/api/gripper/position_table/{position}")
 async def get_position_data(position: int):
     """ポジションテーブルデータ取得"""
-    if not gripper:
+    if not gripper_manager or not gripper_manager.is_connected:
         return JSONResponse({"status": "error", "message": "グリッパー未接続"}, status_code=503)
     
     if not (0 <= position <= 63):
         return JSONResponse({"status": "error", "message": "無効なポジション"}, status_code=400)
     
     try:
-        data = gripper.get_position_data(position)
+        data = await gripper_manager.get_position_table(position)
         return {"status": "ok", "position": position, "data": data}
     except Exception as e:
         return JSONResponse({"status": "error", "message": str(e)}, status_code=500)
@@ -798,7 +1167,7 @@ async def get_position_data(position: int):
 @app.post("/api/gripper/position_table/{position}")
 async def set_position_data(position: int, request: Request):
     """ポジションテーブルデータ設定"""
-    if not gripper:
+    if not gripper_manager or not gripper_manager.is_connected:
         return JSONResponse({"status": "error", "message": "グリッパー未接続"}, status_code=503)
     
     if not (0 <= position <= 63):
@@ -806,15 +1175,14 @@ async def set_position_data(position: int, request: Request):
     
     try:
         data = await request.json()
-        gripper.set_position_data(
-            position,
-            position_mm=data.get("position_mm"),
-            width_mm=data.get("width_mm"),
-            speed_mm_s=data.get("speed_mm_s"),
-            accel_g=data.get("accel_g"),
-            decel_g=data.get("decel_g"),
-            push_current_percent=data.get("push_current_percent", 0)
-        )
+        await gripper_manager.update_position_table(position, {
+            "position": data.get("position_mm"),
+            "width": data.get("width_mm"),
+            "speed": data.get("speed_mm_s"),
+            "accel": data.get("accel_g"),
+            "decel": data.get("decel_g"),
+            "push_current": data.get("push_current_percent", 0)
+        })
         return {"status": "ok", "message": f"ポジション{position}のデータを設定しました"}
     except Exception as e:
         return JSONResponse({"status": "error", "message": str(e)}, status_code=500)
@@ -455,16 +455,15 @@ async function loadAllPositions() {
     showToast('全ポジションデータを読み込み中...', 'info');
     allPositions = [];
     
-    for (let i = 0; i < 64; i++) {
-        try {
-            const response = await fetch(`/api/gripper/position_table/${i}`);
-            const data = await response.json();
-            if (data.status === 'ok') {
-                allPositions.push({ position: i, ...data.data });
-            }
-        } catch (e) {
-            console.error(`Position ${i} load error:`, e);
+    // 全64件を1リクエストで取得 (サーバー側で数行ずつまとめてModbus読み出し)
+    try {
+        const response = await fetch('/api/gripper/position_table');
+        const data = await response.json();
+        if (data.status === 'ok') {
+            allPositions = data.data;
         }
+    } catch (e) {
+        console.error('Position table load error:', e);
     }
     
     showToast(`${allPositions.length}件のデータを読み込みました`, 'success');